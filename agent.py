@@ -10,8 +10,14 @@ Mejoras v2.0:
 """
 
 import time
+import queue
+import random
 import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
 import config
 from mt5_connector import MT5Connector
@@ -22,26 +28,55 @@ from notifier import Notifier
 # ============================================
 # LOGGING
 # ============================================
+# QueueHandler + QueueListener: el write()/flush() a archivo y consola corre
+# en un hilo aparte, asi ningun logger.* del hot path bloquea el tick.
+_log_queue = queue.Queue(-1)
+_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+_file_handler = logging.FileHandler(config.LOG_FILE, encoding="utf-8", delay=True)
+_file_handler.setFormatter(_formatter)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_formatter)
+
 logging.basicConfig(
     level=getattr(logging, config.LOG_LEVEL),
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(config.LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
+    handlers=[QueueHandler(_log_queue)],
 )
+_log_listener = QueueListener(_log_queue, _file_handler, _stream_handler,
+                              respect_handler_level=True)
+_log_listener.start()
+
 logger = logging.getLogger(__name__)
 
+# Segundos por vela de cada timeframe soportado (espejo del tf_map de
+# mt5_connector); construido una sola vez a nivel de modulo
+TIMEFRAME_SECONDS = {
+    "M1": 60, "M5": 300, "M15": 900, "M30": 1800,
+    "H1": 3600, "H4": 14400, "D1": 86400,
+}
+
 
 class TradingAgent:
     """Agente de trading automatizado para XAUUSD v2.0."""
 
+    KEEPALIVE_SECONDS = 60  # Intervalo del ping que mantiene viva la sesion MT5
+
     def __init__(self):
         self.mt5 = MT5Connector()
         self.strategy = Strategy()
         self.risk = RiskManager()
         self.notifier = Notifier()
         self.last_signal_time = None  # Evitar senales duplicadas en la misma vela
+        self._last_eval_candle = None  # Ultima vela cerrada ya evaluada
+        self._last_eval_bucket = None  # Bucket de barra (reloj) de esa evaluacion
+        # Duracion de la vela del timeframe configurado (None si desconocido)
+        self._bar_seconds = TIMEFRAME_SECONDS.get(str(config.TIMEFRAME).upper())
+        self._candle_cache = {}       # (symbol, timeframe) -> (last_closed_time, df)
+        self._owned_tickets = set()   # Tickets abiertos por este agente
+        self._tickets_seeded = False  # Sembrado inicial desde posiciones existentes
+        # Pool para lanzar en paralelo los RPCs independientes a MT5
+        self._io = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mt5-io")
+        self._stop = threading.Event()            # Apagado del hilo keepalive
+        self._need_reconnect = threading.Event()  # Marcado por el keepalive
 
     def start(self):
         """Iniciar el agente."""
@@ -73,47 +108,159 @@ class TradingAgent:
             f"Modo: {dynamic_mode}"
         )
 
+        # Keepalive: evita que la sesion MT5 caduque por inactividad
+        # nocturna y pague el costo de reconexion en el peor momento
+        threading.Thread(target=self._keepalive, name="mt5-keepalive",
+                         daemon=True).start()
+
         # Loop principal
         self._run_loop()
 
+    def _keepalive(self):
+        """Ping periodico a MT5; marca reconexion si la sesion se cayo."""
+        while not self._stop.wait(self.KEEPALIVE_SECONDS):
+            try:
+                if not self.mt5.ping():
+                    self._need_reconnect.set()
+            except Exception:
+                self._need_reconnect.set()
+
     def _run_loop(self):
-        """Ejecutar un solo ciclo del agente."""
+        """Loop principal: un tick por vela cerrada."""
+        reconnect_attempts = 0
         try:
-            self._tick()
-        except Exception as e:
-            logger.error(f"Error en ejecucion: {e}", exc_info=True)
-            self.notifier.notify_error(str(e))
-
-        self.mt5.disconnect()
+            while True:
+                if self._need_reconnect.is_set():
+                    logger.warning("Keepalive detecto sesion caida - reconectando")
+                    if self.mt5.reconnect():
+                        self._need_reconnect.clear()
+                        reconnect_attempts = 0
+                        # El broker puede cambiar point/digits entre sesiones
+                        self.risk.invalidate_levels()
+                    else:
+                        # Backoff exponencial con jitter: el primer reintento
+                        # llega en ~2s (recupera cortes breves) y los
+                        # siguientes se espacian, evitando que todas las
+                        # instancias martilleen al broker al mismo segundo
+                        reconnect_attempts += 1
+                        delay = min(60, 2 ** reconnect_attempts) + random.uniform(0, 1)
+                        logger.warning("Reconexion fallida (intento %d) - "
+                                       "reintento en %.1fs",
+                                       reconnect_attempts, delay)
+                        time.sleep(delay)
+                        continue
+
+                try:
+                    self._tick()
+                except Exception as e:
+                    # Formato lazy (%s) y traceback solo en DEBUG: capturar y
+                    # formatear frames en cada excepcion del loop sale caro
+                    logger.error("Error en ejecucion: %s", e)
+                    logger.debug("Traceback del error en ejecucion", exc_info=True)
+                    self.notifier.notify_error(str(e))
+
+                time.sleep(self._seconds_until_next_candle())
+        except KeyboardInterrupt:
+            logger.info("Agente detenido por el usuario")
+        finally:
+            self._stop.set()
+            self.mt5.disconnect()
+            _log_listener.stop()  # Vaciar la cola de logs pendientes
+
+    def _seconds_until_next_candle(self) -> float:
+        """
+        Calcular cuanto dormir hasta poco despues del proximo cierre de vela.
+
+        Dormir alineado al cierre de vela evita despertares (y RPCs a MT5)
+        en los que la ultima vela cerrada no ha cambiado y el dedup de
+        last_signal_time descartaria el tick de todas formas. Se agrega un
+        jitter aleatorio para no golpear al broker exactamente en el cierre.
+        Con posiciones abiertas se mantiene el poll corto para gestionar
+        Break Even y Trailing Stop entre velas.
+        """
+        tf_seconds = self._bar_seconds
+
+        if tf_seconds is None:
+            return config.CHECK_INTERVAL_SECONDS
+
+        # Poll corto mientras haya posiciones abiertas (BE / trailing)
+        if self.mt5.get_open_positions(config.SYMBOL):
+            return config.CHECK_INTERVAL_SECONDS
+
+        now = time.time()
+        next_close = (int(now // tf_seconds) + 1) * tf_seconds
+        jitter = random.uniform(0.5, 2.0)
+        return max(1.0, next_close - now + jitter)
 
     def _tick(self):
         """Un ciclo de verificacion del mercado."""
+        # Snapshot local: evita un LOAD_ATTR al modulo config por referencia
+        symbol = config.SYMBOL
+        timeframe = config.TIMEFRAME
 
         # 1. Verificar sesion activa
         if not self.strategy.is_session_active():
             return
 
+        # Gate barato antes de cualquier RPC de velas, alineado a cierres de
+        # barra: dentro de un mismo bucket de reloj (time // bar_seconds) el
+        # conjunto de velas cerradas no cambia, asi que si ya se evaluo en
+        # este bucket un re-fetch devolveria la misma vela cerrada. Gatear
+        # por tiempo transcurrido desde la ultima orden (version anterior)
+        # saltaba la primera vela cerrada tras casi cada trade completado.
+        bar_bucket = None
+        may_have_new_bar = True
+        if self._bar_seconds is not None:
+            bar_bucket = int(time.time() // self._bar_seconds)
+            may_have_new_bar = bar_bucket != self._last_eval_bucket
+
+        # Lanzar en paralelo los RPCs independientes a MT5: la latencia del
+        # tick pasa de la suma de los round-trips al maximo de ellos.
+        # Cada valor se obtiene UNA sola vez por tick.
+        fut_positions = self._io.submit(self.mt5.get_open_positions, symbol)
+        fut_symbol = self._io.submit(self.mt5.get_symbol_info, symbol)
+        fut_candles = None
+        if may_have_new_bar:
+            fut_candles = self._io.submit(
+                self._get_candles_cached, symbol, timeframe, 100
+            )
+
+        open_positions = fut_positions.result()
+        symbol_info = fut_symbol.result()
+
         # 2. Gestionar posiciones abiertas (BE y Trailing)
-        self._manage_open_positions()
+        self._manage_open_positions(open_positions, symbol_info)
+
+        # Sin vela nueva posible: solo tocaba gestionar posiciones
+        if fut_candles is None:
+            return
 
         # 3. Verificar si podemos abrir nuevo trade
-        open_positions = self.mt5.get_open_positions(config.SYMBOL)
         if not self.risk.can_open_trade(open_positions):
+            fut_candles.result()  # Consumir el future para no dejar hilos colgando
             return
 
-        # 4. Obtener datos de mercado
-        df = self.mt5.get_candles(config.SYMBOL, config.TIMEFRAME, 100)
+        # 4. Obtener datos de mercado (cacheado por vela cerrada)
+        df = fut_candles.result()
         if df.empty:
             logger.warning("No se pudieron obtener velas")
             return
 
         # 5. Evitar senales duplicadas en la misma vela
-        last_candle_time = df.iloc[-2]['time']
+        last_candle_time = df['time'].iat[-2]
         if self.last_signal_time == last_candle_time:
             return
 
+        # La vela cerrada no cambio desde la ultima evaluacion: el resultado
+        # seria identico (la estrategia solo mira velas cerradas), no se
+        # recalcula nada hasta que cierre una vela nueva
+        if self._last_eval_candle == last_candle_time:
+            return
+
         # 6. Verificar senal (retorna dict con signal, atr_levels, confluencias, riesgo)
         result = self.strategy.check_signal(df)
+        self._last_eval_candle = last_candle_time
+        self._last_eval_bucket = bar_bucket
         signal = result["signal"]
         atr_levels = result["atr_levels"]
         confluences_met = result.get("confluences_met", 0)
@@ -125,7 +272,9 @@ class TradingAgent:
         # 7. Validar margen antes de ejecutar
         account_info = self.mt5.get_account_info()
         free_margin = account_info.get("free_margin", 0)
-        symbol_info = self.mt5.get_symbol_info(config.SYMBOL)
+        balance = None
+        estimated_lot = None
+        price = None
 
         if symbol_info:
             balance = account_info.get("balance", 0)
@@ -134,7 +283,7 @@ class TradingAgent:
                 balance, symbol_info, sl_dist, risk_percent
             )
 
-            price = self.mt5.get_current_price(config.SYMBOL)
+            price = self.mt5.get_current_price(symbol)
             if price:
                 leverage = account_info.get("leverage", 100)
                 entry_price = price["ask"] if signal == "BUY" else price["bid"]
@@ -149,28 +298,89 @@ class TradingAgent:
                     )
                     return
 
-        # 8. Ejecutar trade con riesgo escalonado
-        self._execute_trade(signal, atr_levels, confluences_met, risk_percent)
+        # 8. Ejecutar trade con riesgo escalonado (reusando lo ya calculado)
+        self._execute_trade(signal, atr_levels, confluences_met, risk_percent,
+                            symbol_info=symbol_info, balance=balance,
+                            lot_size=estimated_lot, price=price)
         self.last_signal_time = last_candle_time
 
+    def _get_candles_cached(self, symbol: str, timeframe: str,
+                            count: int = 100):
+        """
+        Obtener velas reutilizando la ventana cacheada mientras no cierre
+        una vela nueva.
+
+        Pedir las 100 velas completas en cada poll re-transfiere y re-copia
+        los mismos datos aunque la senal este gateada por vela cerrada. Se
+        sondea solo con las ultimas 2 velas: si la penultima (ultima cerrada)
+        coincide con la cacheada, se reutiliza la ventana completa y solo se
+        refresca la vela en formacion.
+        """
+        probe = self.mt5.get_candles(symbol, timeframe, 2)
+        if probe.empty or len(probe) < 2:
+            return self.mt5.get_candles(symbol, timeframe, count)
+
+        last_closed_time = probe['time'].iat[-2]
+        key = (symbol, timeframe)
+        cached = self._candle_cache.get(key)
+
+        if cached is not None and cached[0] == last_closed_time and len(cached[1]) >= count:
+            df = cached[1]
+            # Refrescar solo la vela en formacion, columna a columna y
+            # casteando al dtype de cada columna: asignar la fila float64
+            # del probe entero lanza TypeError sobre las columnas float32
+            # en pandas 3 (y las des-optimiza a float64 en pandas 2)
+            for col in df.columns:
+                df.iloc[-1, df.columns.get_loc(col)] = (
+                    df[col].dtype.type(probe[col].iat[-1])
+                )
+            return df
+
+        df = self.mt5.get_candles(symbol, timeframe, count)
+        if not df.empty and len(df) >= 2:
+            # float32 mueve la mitad de bytes en los pases de indicadores
+            # (ewm/rolling son memory-bound); los ~7 digitos significativos
+            # de float32 sobran para XAUUSD con resolucion de 0.01
+            for col in ('open', 'high', 'low', 'close'):
+                df[col] = df[col].astype(np.float32)
+            if 'tick_volume' in df.columns:
+                df['tick_volume'] = df['tick_volume'].astype(np.int32)
+            self._candle_cache[key] = (df['time'].iat[-2], df)
+        return df
+
     def _execute_trade(self, signal: str, atr_levels: dict = None,
-                       confluences_met: int = 5, risk_percent: float = None):
-        """Ejecutar una operacion de trading con riesgo escalonado."""
-        # Obtener info del simbolo
-        symbol_info = self.mt5.get_symbol_info(config.SYMBOL)
+                       confluences_met: int = 5, risk_percent: float = None,
+                       symbol_info: dict = None, balance: float = None,
+                       lot_size: float = None, price: dict = None):
+        """
+        Ejecutar una operacion de trading con riesgo escalonado.
+
+        Los valores ya calculados en la validacion de margen (symbol_info,
+        balance, lote estimado, precio) llegan por parametro para no repetir
+        los mismos RPCs a MT5 entre el check de margen y la ejecucion.
+        """
+        symbol = config.SYMBOL
+
+        # Obtener info del simbolo (reusar la del tick si esta disponible)
+        if not symbol_info:
+            symbol_info = self.mt5.get_symbol_info(symbol)
         if not symbol_info:
             logger.error("No se pudo obtener info del simbolo")
             return
 
-        # Calcular lotaje con riesgo escalonado
-        balance = self.mt5.get_account_balance()
-        sl_distance = atr_levels["sl_distance"] if atr_levels else None
-        lot_size = self.risk.calculate_lot_size(
-            balance, symbol_info, sl_distance, risk_percent
-        )
+        # Calcular lotaje con riesgo escalonado (si no vino ya calculado)
+        if lot_size is None:
+            if balance is None:
+                balance = self.mt5.get_account_balance()
+            sl_distance = atr_levels["sl_distance"] if atr_levels else None
+            lot_size = self.risk.calculate_lot_size(
+                balance, symbol_info, sl_distance, risk_percent
+            )
 
-        # Obtener precio actual
-        price = self.mt5.get_current_price(config.SYMBOL)
+        # Obtener precio actual (reusar el de la validacion de margen;
+        # open_trade vuelve a leer bid/ask justo antes del order_send)
+        if not price:
+            price = self.mt5.get_current_price(symbol)
         if not price:
             logger.error("No se pudo obtener precio actual")
             return
@@ -185,7 +395,7 @@ class TradingAgent:
 
         # Abrir trade
         result = self.mt5.open_trade(
-            symbol=config.SYMBOL,
+            symbol=symbol,
             order_type=signal,
             volume=lot_size,
             sl=levels["sl"],
@@ -194,46 +404,55 @@ class TradingAgent:
         )
 
         if result["success"]:
+            self._owned_tickets.add(result["ticket"])
             result["confluences"] = confluences_met
             result["risk_percent"] = risk_percent
             self.notifier.notify_trade_opened(result)
-            logger.info(f"Trade ejecutado ({confluences_met}/5, {risk_percent}%): {result}")
+            logger.info("Trade ejecutado (%s/5, %s%%): %s",
+                        confluences_met, risk_percent, result)
         else:
-            logger.error(f"Error ejecutando trade: {result['error']}")
+            logger.error("Error ejecutando trade: %s", result['error'])
             self.notifier.notify_error(f"Error abriendo trade: {result['error']}")
 
-    def _manage_open_positions(self):
+    def _manage_open_positions(self, positions: list, symbol_info: dict):
         """Gestionar posiciones abiertas: Break Even y Trailing Stop."""
-        positions = self.mt5.get_open_positions(config.SYMBOL)
-
         if not positions:
             return
 
-        symbol_info = self.mt5.get_symbol_info(config.SYMBOL)
         if not symbol_info:
             return
 
-        for pos in positions:
-            # Solo gestionar trades del agente (v1 y v2)
-            comment = pos.get("comment", "")
-            if "AI Agent" not in comment:
-                continue
-
-            # Verificar Break Even
-            be_result = self.risk.check_break_even(pos, symbol_info)
-            if be_result["action"] == "move_be":
-                success = self.mt5.modify_trade(pos["ticket"], sl=be_result["new_sl"])
-                if success:
-                    self.notifier.notify_trade_modified(
-                        pos["ticket"], "Break Even", be_result["new_sl"]
-                    )
-                continue  # No verificar trailing si acabamos de mover a BE
-
-            # Verificar Trailing Stop
-            trail_result = self.risk.check_trailing_stop(pos, symbol_info)
-            if trail_result["action"] == "trail":
-                success = self.mt5.modify_trade(pos["ticket"], sl=trail_result["new_sl"])
-                if success:
-                    self.notifier.notify_trade_modified(
-                        pos["ticket"], "Trailing Stop", trail_result["new_sl"]
-                    )
+        # Sembrar el set de tickets propios una sola vez con la regla
+        # antigua por comment (posiciones que ya existian al arrancar)
+        if not self._tickets_seeded:
+            for pos in positions:
+                if "AI Agent" in pos.get("comment", ""):
+                    self._owned_tickets.add(pos["ticket"])
+            self._tickets_seeded = True
+
+        # Reconciliar: descartar tickets que ya no estan abiertos
+        self._owned_tickets &= {p["ticket"] for p in positions}
+
+        # Solo gestionar trades del agente (membership O(1) vs scan del comment)
+        mine = [p for p in positions if p["ticket"] in self._owned_tickets]
+
+        # Evaluar BE + Trailing de todas las posiciones en una pasada
+        # vectorizada y enviar las modificaciones en un lote
+        updates = self.risk.evaluate_batch(mine, symbol_info)
+        if not updates:
+            return
+
+        # Enviar el lote en el pool de IO: el tick no se queda bloqueado
+        # esperando un round-trip al broker por cada SL modificado. Repetir
+        # una modificacion ya aplicada en el proximo tick es inocuo (mismo
+        # SL), asi que el desacople no necesita coordinacion extra.
+        self._io.submit(self._apply_sl_updates, updates)
+
+    def _apply_sl_updates(self, updates: list):
+        """Enviar un lote de modificaciones de SL y notificar las aplicadas."""
+        results = self.mt5.modify_trades_batch(updates)
+        for upd, res in zip(updates, results):
+            if res["success"]:
+                self.notifier.notify_trade_modified(
+                    upd["ticket"], upd["reason"], upd["sl"]
+                )
@@ -9,30 +9,298 @@ Uso:
 Requiere datos historicos en formato CSV o conexion a MT5.
 """
 
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 import logging
 import config
 from strategy import Strategy
 
+try:
+    from numba import njit
+except ImportError:
+    # Fallback sin numba: decorador identidad, el loop corre en CPython puro
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+
+        def wrapper(func):
+            return func
+        return wrapper
+
 logging.basicConfig(
     level=logging.WARNING,
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
 logger = logging.getLogger(__name__)
 
+# Codigos de motivo de cierre usados dentro de _simulate (int8); se
+# decodifican a etiquetas con _REASON_LABEL_ARR al materializar los trades
+_REASON_SL = 0
+_REASON_TP = 1
+_REASON_END = 2
+_REASON_LABEL_ARR = np.array(["SL", "TP", "FIN_BACKTEST"])
+
+# Constantes del simulador para XAUUSD, izadas fuera del hot path.
+# Las distancias derivadas de config (BE/SL/TP) se calculan una vez por run()
+# y no a nivel de modulo: run_parallel las sobreescribe en los workers.
+CONTRACT_SIZE = 100.0   # Tamano de contrato estandar
+PIP_PRICE = 0.01 * 10   # Conversion pips -> precio
+
+# Cache de arrays derivados por dataset: en un sweep de parametros la serie
+# OHLC no cambia entre corridas, asi que el resultado de precompute() se
+# reusa mientras no cambien los parametros que afectan a los indicadores
+# (van en la clave). Se vacia al crecer para acotar memoria.
+_DERIVED_CACHE = {}
+_DERIVED_CACHE_MAX = 8
+
+
+def _derived_cache_key(df: pd.DataFrame) -> tuple:
+    """
+    Huella del dataset + parametros de los que depende precompute().
+
+    Huella por contenido (timestamps de los extremos y precios muestreados)
+    y no id(df): un id reciclado por el GC sobre otro DataFrame del mismo
+    largo podria servir indicadores de una serie distinta.
+    """
+    n = len(df)
+    close = df['close']
+    has_time = 'time' in df.columns
+    return (n,
+            str(df['time'].iloc[0]) if has_time else None,
+            str(df['time'].iloc[-1]) if has_time else None,
+            float(close.iloc[0]), float(close.iloc[n // 2]),
+            float(close.iloc[-1]),
+            config.EMA_FAST, config.EMA_SLOW,
+            config.RSI_PERIOD, config.ATR_PERIOD,
+            getattr(config, 'PULLBACK_LOOKBACK', 5),
+            getattr(config, 'LIQUIDITY_LOOKBACK', 10))
+
+
+@njit(cache=True)
+def _simulate(high, low, close, signals, sl_dists, tp_dists, risk_pcts,
+              confluences, initial_balance, be_dist, contract_size, min_bars):
+    """
+    Loop de simulacion barra a barra sobre arrays numpy puros.
+
+    Extraido a funcion de modulo con solo escalares y ndarrays para que
+    numba pueda compilarlo (@njit); sin numba corre igual en CPython.
+    Replica exactamente la semantica por-barra del motor original
+    (prioridad SL -> TP -> BE dentro de cada barra, equity con PnL no
+    realizado, cierre del trade restante al final), pero en vez de tocar
+    cada barra en Python localiza la barra de salida con scans
+    vectorizados sobre los highs/lows futuros y salta directo a ella:
+    fase 1 busca el primer SL/TP/activacion de BE; si gana el BE, fase 2
+    rebusca SL/TP desde ahi con el SL movido a la entrada.
+
+    Los precios y distancias llegan en float32 (XAUUSD usa 2 decimales,
+    sobra precision): la mitad de ancho de banda y el doble de lanes SIMD
+    en los scans. La acumulacion (pnl, balance, equity) se hace en float64
+    para no degradar la precision del resultado.
+
+    Returns:
+        (n_trades, entry_idx, exit_idx, types, entry_prices, exit_prices,
+         lots, pnls, reasons, be_flags, confs, risks, equity, balance)
+    """
+    n = len(close)
+    # Cota superior: a lo sumo un trade cerrado por barra
+    entry_idx = np.empty(n, np.int64)
+    exit_idx = np.empty(n, np.int64)
+    types = np.empty(n, np.int8)          # 1=BUY, -1=SELL
+    entry_prices = np.empty(n, np.float32)
+    exit_prices = np.empty(n, np.float32)
+    lots = np.empty(n, np.float32)
+    pnls = np.empty(n, np.float64)        # crudo; se redondea al materializar
+    reasons = np.empty(n, np.int8)
+    be_flags = np.zeros(n, np.bool_)
+    confs = np.empty(n, np.int64)
+    risks = np.empty(n, np.float64)
+    equity = np.empty(n - min_bars + 1, np.float64)
+    equity[0] = initial_balance
+
+    balance = initial_balance
+    n_trades = 0
+    in_trade = False
+    t_type = 0
+    t_entry = 0.0
+    t_sl = 0.0
+    t_tp = 0.0
+    t_lot = 0.0
+    t_entry_i = 0
+    t_be = False
+    t_conf = 0
+    t_risk = 0.0
+
+    # Indices con senal: estando flat se salta directo a la proxima senal
+    # en vez de iterar barra a barra (el loop pasa a ser event-driven)
+    sig_idx = np.flatnonzero(signals != 0)
+    n_sig = len(sig_idx)
+
+    i = min_bars
+    while i < n:
+        if signals[i] == 0:
+            # Tramo sin trade ni senal: equity plana hasta la proxima senal
+            p = np.searchsorted(sig_idx, i)
+            j = sig_idx[p] if p < n_sig else n
+            equity[i - min_bars + 1:j - min_bars + 1] = balance
+            i = j
+            continue
+
+        # Abrir trade en la barra i
+        t_type = signals[i]
+        t_entry = close[i]
+        sl_distance = sl_dists[i]
+        tp_distance = tp_dists[i]
+        t_sl = t_entry - sl_distance * t_type
+        t_tp = t_entry + tp_distance * t_type
+
+        risk_amount = balance * (risk_pcts[i] / 100.0)
+        value_per_lot = sl_distance * contract_size
+        if value_per_lot > 0:
+            t_lot = risk_amount / value_per_lot
+        else:
+            t_lot = 0.01
+        t_lot = max(0.01, round(t_lot, 2))
+
+        t_entry_i = i
+        t_be = False
+        t_conf = confluences[i]
+        t_risk = risk_pcts[i]
+        in_trade = True
+
+        equity[i - min_bars + 1] = (balance + (close[i] - t_entry) * t_type
+                                    * t_lot * contract_size)
+
+        # Fase 1: primer SL / TP / activacion de BE en las barras futuras
+        seg_hi = high[i + 1:]
+        seg_lo = low[i + 1:]
+        if t_type == 1:  # BUY
+            sl_mask = seg_lo <= t_sl
+            tp_mask = seg_hi >= t_tp
+            be_mask = seg_hi - t_entry >= be_dist
+        else:  # SELL
+            sl_mask = seg_hi >= t_sl
+            tp_mask = seg_lo <= t_tp
+            be_mask = t_entry - seg_lo >= be_dist
+
+        j_sl = np.argmax(sl_mask) if sl_mask.any() else n
+        j_tp = np.argmax(tp_mask) if tp_mask.any() else n
+        j_be = np.argmax(be_mask) if be_mask.any() else n
+
+        exit_bar = n
+        exit_price = 0.0
+        reason = -1
+
+        # Prioridad dentro de la misma barra: SL, luego TP, luego BE
+        if j_sl < n and j_sl <= j_tp and j_sl <= j_be:
+            exit_bar = i + 1 + j_sl
+            exit_price = t_sl
+            reason = _REASON_SL
+        elif j_tp < n and j_tp < j_sl and j_tp <= j_be:
+            exit_bar = i + 1 + j_tp
+            exit_price = t_tp
+            reason = _REASON_TP
+        elif j_be < n:
+            # BE activado: mover SL a la entrada y rebuscar desde ahi
+            be_bar = i + 1 + j_be
+            t_sl = t_entry + 0.1 * t_type  # +/- 1 pip
+            t_be = True
+
+            # Fase 2: SL/TP con el nuevo SL, sin mas chequeos de BE
+            seg2_hi = high[be_bar + 1:]
+            seg2_lo = low[be_bar + 1:]
+            if t_type == 1:
+                sl2_mask = seg2_lo <= t_sl
+                tp2_mask = seg2_hi >= t_tp
+            else:
+                sl2_mask = seg2_hi >= t_sl
+                tp2_mask = seg2_lo <= t_tp
+
+            j2_sl = np.argmax(sl2_mask) if sl2_mask.any() else n
+            j2_tp = np.argmax(tp2_mask) if tp2_mask.any() else n
+
+            if j2_sl <= j2_tp and j2_sl < n:
+                exit_bar = be_bar + 1 + j2_sl
+                exit_price = t_sl
+                reason = _REASON_SL
+            elif j2_tp < j2_sl:
+                exit_bar = be_bar + 1 + j2_tp
+                exit_price = t_tp
+                reason = _REASON_TP
+
+        # Equity de las barras en posicion (hasta la barra previa a la salida)
+        stop = exit_bar if exit_bar < n else n
+        if stop > i + 1:
+            equity[i + 1 - min_bars + 1:stop - min_bars + 1] = (
+                balance + (close[i + 1:stop].astype(np.float64)
+                           - np.float64(t_entry)) * t_type
+                * np.float64(t_lot) * contract_size
+            )
+
+        if exit_bar >= n:
+            # Sin salida en el periodo: el trade queda abierto hasta el final
+            break
+
+        # Cerrar en la barra de salida y reanudar ahi mismo (el motor
+        # original permite una nueva entrada en la misma barra del cierre)
+        pnl = (np.float64(exit_price) - np.float64(t_entry)) * t_type \
+            * np.float64(t_lot) * contract_size
+        balance += pnl
+
+        entry_idx[n_trades] = t_entry_i
+        exit_idx[n_trades] = exit_bar
+        types[n_trades] = t_type
+        entry_prices[n_trades] = t_entry
+        exit_prices[n_trades] = exit_price
+        lots[n_trades] = t_lot
+        pnls[n_trades] = pnl
+        reasons[n_trades] = reason
+        be_flags[n_trades] = t_be
+        confs[n_trades] = t_conf
+        risks[n_trades] = t_risk
+        n_trades += 1
+        in_trade = False
+        i = exit_bar
+
+    # Cerrar trade abierto al final del periodo
+    if in_trade:
+        exit_price = close[n - 1]
+        pnl_per_unit = (np.float64(exit_price) - np.float64(t_entry)) * t_type
+        pnl = pnl_per_unit * np.float64(t_lot) * contract_size
+        balance += pnl
+
+        entry_idx[n_trades] = t_entry_i
+        exit_idx[n_trades] = n - 1
+        types[n_trades] = t_type
+        entry_prices[n_trades] = t_entry
+        exit_prices[n_trades] = exit_price
+        lots[n_trades] = t_lot
+        pnls[n_trades] = pnl
+        reasons[n_trades] = _REASON_END
+        be_flags[n_trades] = t_be
+        confs[n_trades] = t_conf
+        risks[n_trades] = t_risk
+        n_trades += 1
+
+    return (n_trades, entry_idx, exit_idx, types, entry_prices, exit_prices,
+            lots, pnls, reasons, be_flags, confs, risks, equity, balance)
+
 
 class BacktestEngine:
     """Motor de backtesting para evaluar la estrategia."""
 
-    def __init__(self, initial_balance: float = 10000.0):
+    def __init__(self, initial_balance: float = 10000.0, verbose: bool = True):
         self.strategy = Strategy()
         self.initial_balance = initial_balance
         self.balance = initial_balance
-        self.equity_curve = []
-        self.trades = []
-        self.open_trade = None
+        # Con verbose=False (sweeps) no se formatea ni imprime nada
+        self.verbose = verbose
+        # Curva de equity preasignada (np.float64) por _simulate, no lista
+        self.equity_curve = np.empty(0, dtype=np.float64)
+        # Trades en formato SoA: dict de columnas numpy alineadas
+        self.trades = {}
 
     def run(self, df: pd.DataFrame) -> dict:
         """
@@ -45,258 +313,201 @@ class BacktestEngine:
             dict con metricas de rendimiento
         """
         self.balance = self.initial_balance
-        self.equity_curve = [self.initial_balance]
-        self.trades = []
-        self.open_trade = None
+        self.equity_curve = np.empty(0, dtype=np.float64)
+        self.trades = {}
 
         min_bars = config.EMA_SLOW + 20
         if len(df) < min_bars:
             logger.error(f"Datos insuficientes: {len(df)} barras (minimo {min_bars})")
             return {}
 
-        print(f"Iniciando backtest: {len(df)} barras | Balance: ${self.initial_balance:.2f}")
-        print(f"Periodo: {df.iloc[0]['time']} a {df.iloc[-1]['time']}")
-        print("-" * 60)
-
-        # Simular barra por barra
-        for i in range(min_bars, len(df)):
-            # Ventana de datos hasta la barra actual (inclusive)
-            window = df.iloc[:i + 1].copy()
-            current_bar = df.iloc[i]
-
-            # Gestionar trade abierto
-            if self.open_trade is not None:
-                self._manage_trade(current_bar)
-
-            # Si no hay trade abierto, buscar senal
-            if self.open_trade is None:
-                self._check_entry(window, current_bar)
+        if self.verbose:
+            print(f"Iniciando backtest: {len(df)} barras | Balance: ${self.initial_balance:.2f}")
+            # Acceso por columna (escalar) en vez de materializar la fila entera
+            print(f"Periodo: {df['time'].iloc[0]} a {df['time'].iloc[-1]}")
+            print("-" * 60)
 
-            self.equity_curve.append(self.balance + self._unrealized_pnl(current_bar))
-
-        # Cerrar trade abierto al final
-        if self.open_trade is not None:
-            self._close_trade(df.iloc[-1]['close'], "FIN_BACKTEST")
-
-        metrics = self._calculate_metrics()
-        self._print_report(metrics)
-        return metrics
-
-    def _check_entry(self, window: pd.DataFrame, current_bar: pd.Series):
-        """Verificar si hay senal de entrada."""
-        # Suprimir logs de la estrategia durante backtest
+        # Suprimir logs de la estrategia una sola vez para todo el run
+        # (antes se hacia flip/restore del nivel en cada barra)
         strategy_logger = logging.getLogger('strategy')
         prev_level = strategy_logger.level
         strategy_logger.setLevel(logging.CRITICAL)
 
         try:
-            result = self.strategy.check_signal(window)
+            # Precalcular indicadores una sola vez sobre toda la serie
+            # (copiar una ventana creciente y recalcular por barra hacia
+            # O(N^2) el loop principal). En sweeps el resultado se cachea
+            # por dataset/parametros y se reusa entre corridas.
+            key = _derived_cache_key(df)
+            precomputed = _DERIVED_CACHE.get(key)
+            if precomputed is None:
+                precomputed = self.strategy.precompute(df)
+                if len(_DERIVED_CACHE) >= _DERIVED_CACHE_MAX:
+                    _DERIVED_CACHE.clear()
+                _DERIVED_CACHE[key] = precomputed
+
+            # Senales por barra como arrays (entrada para el loop compilable)
+            (signals, sl_dists, tp_dists,
+             risk_pcts, confluences) = self._build_signal_arrays(df, precomputed,
+                                                                min_bars)
         finally:
             strategy_logger.setLevel(prev_level)
 
-        signal = result["signal"]
-        atr_levels = result["atr_levels"]
-        confluences_met = result.get("confluences_met", 5)
-        risk_percent = result.get("risk_percent", config.RISK_PERCENT)
-
-        if signal == "NONE":
-            return
-
-        entry_price = current_bar['close']
-
-        # Calcular SL/TP
-        if atr_levels is not None:
-            sl_distance = atr_levels["sl_distance"]
-            tp_distance = atr_levels["tp_distance"]
-        else:
-            sl_distance = config.STOP_LOSS_PIPS * 0.01 * 10  # pips -> precio para XAUUSD
-            tp_distance = config.TAKE_PROFIT_PIPS * 0.01 * 10
-
-        if signal == "BUY":
-            sl = entry_price - sl_distance
-            tp = entry_price + tp_distance
-        else:
-            sl = entry_price + sl_distance
-            tp = entry_price - tp_distance
-
-        # Calcular lotaje con riesgo escalonado
-        risk_amount = self.balance * (risk_percent / 100)
-        contract_size = 100  # XAUUSD estandar
-        value_per_lot = sl_distance * contract_size
-        lot_size = risk_amount / value_per_lot if value_per_lot > 0 else 0.01
-        lot_size = max(0.01, round(lot_size, 2))
-
-        self.open_trade = {
-            "type": signal,
-            "entry_price": entry_price,
-            "sl": sl,
-            "tp": tp,
-            "lot_size": lot_size,
-            "entry_time": current_bar['time'],
-            "sl_distance": sl_distance,
-            "be_activated": False,
-            "confluences": confluences_met,
-            "risk_percent": risk_percent,
+        # Loop de simulacion sobre ndarrays puros (compilado con numba si
+        # esta disponible; identico en CPython si no)
+        (n_trades, entry_idx, exit_idx, types, entry_prices, exit_prices,
+         lots, pnls, reasons, be_flags, confs, risks,
+         equity, balance) = _simulate(
+            df['high'].to_numpy(np.float32),
+            df['low'].to_numpy(np.float32),
+            df['close'].to_numpy(np.float32),
+            signals,
+            sl_dists.astype(np.float32),
+            tp_dists.astype(np.float32),
+            risk_pcts.astype(np.float32),
+            confluences,
+            self.initial_balance,
+            config.BREAK_EVEN_PIPS * PIP_PRICE,
+            CONTRACT_SIZE,
+            min_bars,
+        )
+
+        self.balance = balance
+        self.equity_curve = equity
+
+        # Registros de trade en formato SoA (columnas numpy, sin dicts por
+        # trade): las metricas se calculan con reducciones sobre mascaras
+        k = n_trades
+        pnl_per_unit = (exit_prices[:k] - entry_prices[:k]) * types[:k]
+        self.trades = {
+            "type": np.where(types[:k] == 1, "BUY", "SELL"),
+            "entry_price": entry_prices[:k],
+            "exit_price": exit_prices[:k],
+            "entry_time": df['time'].to_numpy()[entry_idx[:k]],
+            "lot_size": lots[:k],
+            "pnl": np.round(pnls[:k], 2),
+            "pnl_pips": np.round(pnl_per_unit / 0.1, 1),  # pips para XAUUSD
+            "reason": _REASON_LABEL_ARR[reasons[:k]],
+            "be_activated": be_flags[:k],
+            "confluences": confs[:k],
+            "risk_percent": risks[:k],
         }
 
-    def _manage_trade(self, bar: pd.Series):
-        """Gestionar trade abierto: verificar SL, TP, BE."""
-        trade = self.open_trade
-
-        if trade["type"] == "BUY":
-            # Verificar SL (low toca o cruza SL)
-            if bar['low'] <= trade["sl"]:
-                self._close_trade(trade["sl"], "SL")
-                return
-
-            # Verificar TP (high toca o cruza TP)
-            if bar['high'] >= trade["tp"]:
-                self._close_trade(trade["tp"], "TP")
-                return
-
-            # Break Even
-            current_profit_distance = bar['high'] - trade["entry_price"]
-            be_distance = config.BREAK_EVEN_PIPS * 0.01 * 10
-            if (not trade["be_activated"] and current_profit_distance >= be_distance):
-                trade["sl"] = trade["entry_price"] + 0.1  # +1 pip
-                trade["be_activated"] = True
-
-        else:  # SELL
-            # Verificar SL
-            if bar['high'] >= trade["sl"]:
-                self._close_trade(trade["sl"], "SL")
-                return
-
-            # Verificar TP
-            if bar['low'] <= trade["tp"]:
-                self._close_trade(trade["tp"], "TP")
-                return
-
-            # Break Even
-            current_profit_distance = trade["entry_price"] - bar['low']
-            be_distance = config.BREAK_EVEN_PIPS * 0.01 * 10
-            if (not trade["be_activated"] and current_profit_distance >= be_distance):
-                trade["sl"] = trade["entry_price"] - 0.1  # -1 pip
-                trade["be_activated"] = True
-
-    def _close_trade(self, exit_price: float, reason: str):
-        """Cerrar trade y registrar resultado."""
-        trade = self.open_trade
-
-        if trade["type"] == "BUY":
-            pnl_per_unit = exit_price - trade["entry_price"]
-        else:
-            pnl_per_unit = trade["entry_price"] - exit_price
-
-        contract_size = 100
-        pnl = pnl_per_unit * trade["lot_size"] * contract_size
-
-        self.balance += pnl
-
-        trade_record = {
-            "type": trade["type"],
-            "entry_price": trade["entry_price"],
-            "exit_price": exit_price,
-            "entry_time": trade["entry_time"],
-            "lot_size": trade["lot_size"],
-            "pnl": round(pnl, 2),
-            "pnl_pips": round(pnl_per_unit / 0.1, 1),  # pips para XAUUSD
-            "reason": reason,
-            "be_activated": trade["be_activated"],
-            "confluences": trade.get("confluences", 5),
-            "risk_percent": trade.get("risk_percent", config.RISK_PERCENT),
-        }
+        metrics = self._calculate_metrics()
+        if self.verbose:
+            self._print_report(metrics)
+        return metrics
 
-        self.trades.append(trade_record)
-        self.open_trade = None
+    def _build_signal_arrays(self, df: pd.DataFrame, precomputed: dict,
+                             min_bars: int) -> tuple:
+        """
+        Evaluar la senal de cada barra y devolverla como arrays numpy.
 
-    def _unrealized_pnl(self, bar: pd.Series) -> float:
-        """Calcular PnL no realizado del trade abierto."""
-        if self.open_trade is None:
-            return 0.0
+        La senal solo depende de los datos historicos (no del estado del
+        trade), asi que puede evaluarse para todas las barras por adelantado
+        con Strategy.signals_vector (una sola pasada vectorizada) y alimentar
+        el loop de simulacion con ndarrays puros.
+        """
+        (signals, sl_dists, tp_dists,
+         risk_pcts, confluences) = self.strategy.signals_vector(precomputed,
+                                                                min_bars)
 
-        trade = self.open_trade
-        current_price = bar['close']
-        contract_size = 100
+        # Fallback a distancias fijas donde no aplica el ATR dinamico
+        fixed_sl = config.STOP_LOSS_PIPS * PIP_PRICE
+        fixed_tp = config.TAKE_PROFIT_PIPS * PIP_PRICE
+        active = signals != 0
+        sl_dists = np.where(active & ~np.isnan(sl_dists), sl_dists,
+                            np.where(active, fixed_sl, 0.0))
+        tp_dists = np.where(active & ~np.isnan(tp_dists), tp_dists,
+                            np.where(active, fixed_tp, 0.0))
 
-        if trade["type"] == "BUY":
-            pnl = (current_price - trade["entry_price"]) * trade["lot_size"] * contract_size
-        else:
-            pnl = (trade["entry_price"] - current_price) * trade["lot_size"] * contract_size
-
-        return pnl
+        return signals, sl_dists, tp_dists, risk_pcts, confluences
 
     def _calculate_metrics(self) -> dict:
-        """Calcular metricas de rendimiento."""
-        if not self.trades:
+        """Calcular metricas de rendimiento (reducciones sobre columnas SoA)."""
+        if not self.trades or len(self.trades["pnl"]) == 0:
             return {
                 "total_trades": 0,
                 "message": "Sin trades generados en el periodo"
             }
 
-        wins = [t for t in self.trades if t["pnl"] > 0]
-        losses = [t for t in self.trades if t["pnl"] < 0]
-        breakevens = [t for t in self.trades if t["pnl"] == 0]
+        pnl = self.trades["pnl"]
+        total_trades = len(pnl)
+
+        wins_mask = pnl > 0
+        losses_mask = pnl < 0
+        n_wins = int(wins_mask.sum())
+        n_losses = int(losses_mask.sum())
+        n_breakevens = total_trades - n_wins - n_losses
 
-        total_profit = sum(t["pnl"] for t in wins)
-        total_loss = abs(sum(t["pnl"] for t in losses))
+        total_profit = float(pnl[wins_mask].sum())
+        total_loss = float(abs(pnl[losses_mask].sum()))
 
-        win_rate = len(wins) / len(self.trades) * 100 if self.trades else 0
+        win_rate = n_wins / total_trades * 100
         profit_factor = total_profit / total_loss if total_loss > 0 else float('inf')
 
-        # Drawdown
-        equity = pd.Series(self.equity_curve)
-        running_max = equity.cummax()
+        # Drawdown (numpy puro: sin envolver la curva en pd.Series)
+        equity = np.asarray(self.equity_curve, dtype=np.float64)
+        running_max = np.maximum.accumulate(equity)
         drawdown = equity - running_max
-        max_drawdown = drawdown.min()
-        max_drawdown_pct = (max_drawdown / running_max[drawdown.idxmin()]) * 100 if max_drawdown < 0 else 0
+        dd_idx = drawdown.argmin()
+        max_drawdown = drawdown[dd_idx]
+        max_drawdown_pct = (max_drawdown / running_max[dd_idx]) * 100 if max_drawdown < 0 else 0
 
         net_profit = self.balance - self.initial_balance
         roi = (net_profit / self.initial_balance) * 100
 
-        # Racha maxima
-        streaks = []
-        current_streak = 0
-        for t in self.trades:
-            if t["pnl"] > 0:
-                current_streak = max(0, current_streak) + 1
-            elif t["pnl"] < 0:
-                current_streak = min(0, current_streak) - 1
-            streaks.append(current_streak)
-
-        max_win_streak = max(streaks) if streaks else 0
-        max_loss_streak = abs(min(streaks)) if streaks else 0
-
-        avg_win = total_profit / len(wins) if wins else 0
-        avg_loss = total_loss / len(losses) if losses else 0
+        # Racha maxima: np.sign + run-length encoding en vez de loop Python.
+        # Los trades con pnl == 0 no alteran la racha, asi que se filtran.
+        signs = np.sign(pnl[pnl != 0]).astype(np.int8)
+        max_win_streak = 0
+        max_loss_streak = 0
+        if signs.size:
+            starts = np.r_[0, np.flatnonzero(np.diff(signs)) + 1]
+            lengths = np.diff(np.r_[starts, signs.size])
+            win_lengths = lengths[signs[starts] == 1]
+            loss_lengths = lengths[signs[starts] == -1]
+            if win_lengths.size:
+                max_win_streak = int(win_lengths.max())
+            if loss_lengths.size:
+                max_loss_streak = int(loss_lengths.max())
+
+        avg_win = total_profit / n_wins if n_wins else 0
+        avg_loss = total_loss / n_losses if n_losses else 0
 
         # Trades por motivo de cierre
-        tp_trades = len([t for t in self.trades if t["reason"] == "TP"])
-        sl_trades = len([t for t in self.trades if t["reason"] == "SL"])
-        be_activated = len([t for t in self.trades if t["be_activated"]])
+        reason = self.trades["reason"]
+        tp_trades = int((reason == _REASON_LABEL_ARR[_REASON_TP]).sum())
+        sl_trades = int((reason == _REASON_LABEL_ARR[_REASON_SL]).sum())
+        be_activated = int(self.trades["be_activated"].sum())
 
-        # Desglose por confluencias
+        # Desglose por confluencias: una sola pasada (unique + bincount) en
+        # vez de una mascara completa por nivel; niveles nuevos salen gratis
         by_confluences = {}
-        for conf_level in [3, 4, 5]:
-            conf_trades = [t for t in self.trades if t.get("confluences", 5) == conf_level]
-            if conf_trades:
-                conf_wins = [t for t in conf_trades if t["pnl"] > 0]
-                conf_pnl = sum(t["pnl"] for t in conf_trades)
-                conf_wr = len(conf_wins) / len(conf_trades) * 100
-                by_confluences[conf_level] = {
-                    "trades": len(conf_trades),
-                    "wins": len(conf_wins),
-                    "losses": len(conf_trades) - len(conf_wins),
-                    "win_rate": round(conf_wr, 1),
-                    "pnl": round(conf_pnl, 2),
-                    "risk_percent": conf_trades[0].get("risk_percent", 0),
-                }
+        confluences = self.trades["confluences"]
+        levels, first_idx, inverse, counts = np.unique(
+            confluences, return_index=True, return_inverse=True,
+            return_counts=True)
+        wins_per_level = np.bincount(inverse, weights=(pnl > 0))
+        pnl_per_level = np.bincount(inverse, weights=pnl)
+        risk_per_level = self.trades["risk_percent"][first_idx]
+        for j, conf_level in enumerate(levels):
+            n_conf = int(counts[j])
+            conf_wins = int(wins_per_level[j])
+            by_confluences[int(conf_level)] = {
+                "trades": n_conf,
+                "wins": conf_wins,
+                "losses": n_conf - conf_wins,
+                "win_rate": round(conf_wins / n_conf * 100, 1),
+                "pnl": round(float(pnl_per_level[j]), 2),
+                "risk_percent": float(risk_per_level[j]),
+            }
 
         return {
-            "total_trades": len(self.trades),
-            "wins": len(wins),
-            "losses": len(losses),
-            "breakevens": len(breakevens),
+            "total_trades": total_trades,
+            "wins": n_wins,
+            "losses": n_losses,
+            "breakevens": n_breakevens,
             "win_rate": round(win_rate, 1),
             "profit_factor": round(profit_factor, 2),
             "net_profit": round(net_profit, 2),
@@ -377,6 +588,61 @@ class BacktestEngine:
             print("EVALUACION: Estrategia NO RENTABLE - requiere cambios")
 
 
+# Estado por worker del sweep paralelo (seteado por el initializer del pool)
+_sweep_df = None
+_sweep_balance = 10000.0
+
+
+def _init_sweep_worker(df: pd.DataFrame, initial_balance: float):
+    """Recibir el DataFrame una sola vez por proceso worker."""
+    global _sweep_df, _sweep_balance
+    _sweep_df = df
+    _sweep_balance = initial_balance
+
+
+def _run_sweep_worker(params: dict) -> dict:
+    """
+    Ejecutar una combinacion de parametros sobre el df del worker.
+
+    Aplica los overrides al modulo config del proceso hijo (cada worker
+    tiene su propia copia) y corre un engine nuevo en modo silencioso.
+    """
+    for key, value in params.items():
+        setattr(config, key, value)
+
+    engine = BacktestEngine(initial_balance=_sweep_balance, verbose=False)
+    return engine.run(_sweep_df)
+
+
+def run_parallel(df: pd.DataFrame, param_grid: list,
+                 initial_balance: float = 10000.0,
+                 max_workers: int = None) -> list:
+    """
+    Ejecutar un barrido de parametros en paralelo con procesos.
+
+    Cada item de param_grid es un dict {atributo de config: valor} (p.ej.
+    {"STOP_LOSS_PIPS": 40, "TAKE_PROFIT_PIPS": 80}). Los backtests son
+    independientes entre si, asi que escalan casi lineal con los cores;
+    el df se envia una vez por worker (initializer del pool), no por tarea.
+
+    Returns:
+        Lista de (params, metrics) en orden de finalizacion
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_sweep_worker,
+                             initargs=(df, initial_balance)) as pool:
+        futures = {pool.submit(_run_sweep_worker, params): params
+                   for params in param_grid}
+        for fut in as_completed(futures):
+            results.append((futures[fut], fut.result()))
+
+    return results
+
+
 def run_backtest_from_mt5():
     """Ejecutar backtest obteniendo datos de MT5."""
     try:
@@ -412,8 +678,17 @@ def run_backtest_from_mt5():
         print("No se pudieron obtener datos historicos")
         return
 
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
+    # Armar el DataFrame por columnas del structured array de MT5: vistas
+    # sin copia para los floats y cast directo a datetime64 para el tiempo,
+    # en vez de pd.DataFrame(rates) + una pasada extra de pd.to_datetime
+    df = pd.DataFrame({
+        'time': rates['time'].astype('datetime64[s]'),
+        'open': rates['open'],
+        'high': rates['high'],
+        'low': rates['low'],
+        'close': rates['close'],
+        'tick_volume': rates['tick_volume'],
+    })
 
     print(f"Datos obtenidos: {len(df)} barras de {config.SYMBOL} {config.TIMEFRAME}")
 
@@ -427,8 +702,16 @@ def run_backtest_from_csv(filepath: str):
 
     El CSV debe tener columnas: time, open, high, low, close, tick_volume
     """
+    # Dtypes explicitos: evita la pasada de inferencia sobre todo el archivo
+    dtypes = {'open': 'float64', 'high': 'float64',
+              'low': 'float64', 'close': 'float64'}
     try:
-        df = pd.read_csv(filepath)
+        try:
+            # Parser pyarrow (multihilo), 3-10x mas rapido en CSVs grandes
+            df = pd.read_csv(filepath, engine='pyarrow', dtype=dtypes)
+        except (ImportError, ValueError):
+            # Sin pyarrow instalado: parser C con los mismos dtypes
+            df = pd.read_csv(filepath, dtype=dtypes)
     except FileNotFoundError:
         print(f"Archivo no encontrado: {filepath}")
         return
@@ -5,23 +5,55 @@ MT5 Connector - Conexión y operaciones con MetaTrader 5
 
 import MetaTrader5 as mt5
 import pandas as pd
+import time
 from datetime import datetime
+from functools import lru_cache
 import logging
 import config
 
 logger = logging.getLogger(__name__)
 
+# Constantes a nivel de modulo: evitar reconstruir estos dicts en cada
+# llamada a get_candles / order_send
+_TF_MAP = {
+    "M1": mt5.TIMEFRAME_M1,
+    "M5": mt5.TIMEFRAME_M5,
+    "M15": mt5.TIMEFRAME_M15,
+    "M30": mt5.TIMEFRAME_M30,
+    "H1": mt5.TIMEFRAME_H1,
+    "H4": mt5.TIMEFRAME_H4,
+    "D1": mt5.TIMEFRAME_D1,
+}
+
+# Campos comunes de toda orden a mercado (apertura y cierre)
+_ORDER_REQUEST_BASE = {
+    "action": mt5.TRADE_ACTION_DEAL,
+    "deviation": 20,
+    "magic": 123456,
+    "type_time": mt5.ORDER_TIME_GTC,
+    "type_filling": mt5.ORDER_FILLING_IOC,
+}
+
 
 class MT5Connector:
     """Maneja la conexión y operaciones con MetaTrader 5."""
 
+    # Ventana del cache de account_info: balance/equity/margen se leen
+    # varias veces dentro del mismo tick, una sola consulta IPC alcanza
+    _ACCT_TTL = 0.1
+    # Ventana del cache de ticks: de-duplica el symbol_info_tick de la
+    # validacion de margen y el de open_trade en el mismo camino de entrada
+    _TICK_TTL = 0.05
+
     def __init__(self):
         self.connected = False
+        self._acct_cache = (0.0, None)  # (monotonic-ts, struct de mt5)
+        self._tick_cache = {}  # symbol -> (monotonic-ts, dict bid/ask)
 
     def connect(self) -> bool:
         """Conectar a MetaTrader 5."""
         if not mt5.initialize(path=config.MT5_PATH):
-            logger.error(f"Error inicializando MT5: {mt5.last_error()}")
+            logger.error("Error inicializando MT5: %s", mt5.last_error())
             return False
 
         authorized = mt5.login(
@@ -31,15 +63,16 @@ class MT5Connector:
         )
 
         if not authorized:
-            logger.error(f"Error de autenticación MT5: {mt5.last_error()}")
+            logger.error("Error de autenticación MT5: %s", mt5.last_error())
             mt5.shutdown()
             return False
 
         self.connected = True
         account_info = mt5.account_info()
-        logger.info(f"Conectado a MT5 - Cuenta: {account_info.login}, "
-                     f"Balance: ${account_info.balance:.2f}, "
-                     f"Servidor: {account_info.server}")
+        logger.info("Conectado a MT5 - Cuenta: %s, Balance: $%.2f, "
+                    "Servidor: %s",
+                    account_info.login, account_info.balance,
+                    account_info.server)
         return True
 
     def disconnect(self):
@@ -52,11 +85,35 @@ class MT5Connector:
         """Intentar reconexión."""
         logger.warning("Intentando reconexión a MT5...")
         self.disconnect()
+        self.invalidate_symbol_info()
+        self._acct_cache = (0.0, None)
+        self._tick_cache.clear()
         return self.connect()
 
+    def ping(self) -> bool:
+        """Keepalive barato: consultar terminal_info sin tocar la cuenta."""
+        return mt5.terminal_info() is not None
+
+    def _account_info_cached(self):
+        """
+        mt5.account_info() con cache de corta duracion.
+
+        Una iteracion tipica del loop lee balance (lotaje), margen libre
+        (validacion) y equity (stats) por separado; con el cache las tres
+        lecturas comparten un solo round-trip IPC por ventana de 100ms.
+        Los fallos (None) no se cachean.
+        """
+        ts, info = self._acct_cache
+        if info is not None and time.monotonic() - ts < self._ACCT_TTL:
+            return info
+        info = mt5.account_info()
+        if info is not None:
+            self._acct_cache = (time.monotonic(), info)
+        return info
+
     def get_account_balance(self) -> float:
         """Obtener balance de la cuenta."""
-        info = mt5.account_info()
+        info = self._account_info_cached()
         if info is None:
             logger.error("No se pudo obtener info de cuenta")
             return 0.0
@@ -64,7 +121,7 @@ class MT5Connector:
 
     def get_account_info(self) -> dict:
         """Obtener información completa de la cuenta."""
-        info = mt5.account_info()
+        info = self._account_info_cached()
         if info is None:
             return {}
         return {
@@ -79,36 +136,46 @@ class MT5Connector:
 
     def get_candles(self, symbol: str, timeframe: str, count: int = 100) -> pd.DataFrame:
         """Obtener velas históricas."""
-        tf_map = {
-            "M1": mt5.TIMEFRAME_M1,
-            "M5": mt5.TIMEFRAME_M5,
-            "M15": mt5.TIMEFRAME_M15,
-            "M30": mt5.TIMEFRAME_M30,
-            "H1": mt5.TIMEFRAME_H1,
-            "H4": mt5.TIMEFRAME_H4,
-            "D1": mt5.TIMEFRAME_D1,
-        }
-
-        mt5_tf = tf_map.get(timeframe)
+        mt5_tf = _TF_MAP.get(timeframe)
         if mt5_tf is None:
-            logger.error(f"Timeframe no válido: {timeframe}")
+            logger.error("Timeframe no válido: %s", timeframe)
             return pd.DataFrame()
 
         rates = mt5.copy_rates_from_pos(symbol, mt5_tf, 0, count)
 
         if rates is None or len(rates) == 0:
-            logger.error(f"No se pudieron obtener velas para {symbol}")
+            logger.error("No se pudieron obtener velas para %s", symbol)
             return pd.DataFrame()
 
         df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
+        # Cast directo del epoch int64 a datetime64: mas barato que la
+        # pasada de inferencia de pd.to_datetime (mismo idioma que en
+        # run_backtest_from_mt5)
+        df['time'] = df['time'].to_numpy().astype('datetime64[s]')
         return df
 
     def get_symbol_info(self, symbol: str) -> dict:
-        """Obtener información del símbolo (spread, punto, etc.)."""
+        """
+        Obtener información del símbolo (spread, punto, etc.).
+
+        Los metadatos del símbolo (point, digits, volume_step, contract_size)
+        no cambian intradía, así que se cachean con un TTL de 5 minutos:
+        la clave incluye un bucket de time.monotonic() que rota la entrada
+        sola. El cache se invalida además en reconnect().
+        """
+        bucket = int(time.monotonic() // 300)
+        result = self._get_symbol_info_cached(symbol, bucket)
+        if not result:
+            # No cachear fallos: permitir reintentar en el proximo tick
+            self._get_symbol_info_cached.cache_clear()
+        return result
+
+    @lru_cache(maxsize=32)
+    def _get_symbol_info_cached(self, symbol: str, bucket: int) -> dict:
+        """Consulta real a MT5; bucket solo participa en la clave del cache."""
         info = mt5.symbol_info(symbol)
         if info is None:
-            logger.error(f"Símbolo no encontrado: {symbol}")
+            logger.error("Símbolo no encontrado: %s", symbol)
             return {}
 
         # Asegurar que el símbolo esté visible
@@ -127,12 +194,28 @@ class MT5Connector:
             "ask": info.ask,
         }
 
+    def invalidate_symbol_info(self):
+        """Vaciar el cache de símbolos (tras reconexión o cambio de cuenta)."""
+        self._get_symbol_info_cached.cache_clear()
+
     def get_current_price(self, symbol: str) -> dict:
-        """Obtener precio actual bid/ask."""
+        """
+        Obtener precio actual bid/ask.
+
+        Cachea el ultimo tick por 50ms: la secuencia validacion de margen →
+        open_trade lee el precio dos veces en el mismo instante logico y con
+        el cache comparte un solo RPC. El deviation de la orden ya absorbe
+        esa ventana de staleness. Los fallos no se cachean.
+        """
+        entry = self._tick_cache.get(symbol)
+        if entry is not None and time.monotonic() - entry[0] < self._TICK_TTL:
+            return entry[1]
         tick = mt5.symbol_info_tick(symbol)
         if tick is None:
             return {}
-        return {"bid": tick.bid, "ask": tick.ask, "time": tick.time}
+        price = {"bid": tick.bid, "ask": tick.ask, "time": tick.time}
+        self._tick_cache[symbol] = (time.monotonic(), price)
+        return price
 
     def open_trade(self, symbol: str, order_type: str, volume: float,
                    sl: float, tp: float, comment: str = "AI Agent") -> dict:
@@ -161,18 +244,14 @@ class MT5Connector:
             return {"success": False, "error": f"Tipo de orden no válido: {order_type}"}
 
         request = {
-            "action": mt5.TRADE_ACTION_DEAL,
+            **_ORDER_REQUEST_BASE,
             "symbol": symbol,
             "volume": volume,
             "type": trade_type,
             "price": price,
             "sl": sl,
             "tp": tp,
-            "deviation": 20,
-            "magic": 123456,
             "comment": comment,
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
         }
 
         result = mt5.order_send(request)
@@ -183,8 +262,9 @@ class MT5Connector:
         if result.retcode != mt5.TRADE_RETCODE_DONE:
             return {"success": False, "error": f"Orden rechazada: {result.retcode} - {result.comment}"}
 
-        logger.info(f"✅ Trade abierto: {order_type} {volume} {symbol} @ {price} | "
-                     f"SL: {sl} | TP: {tp} | Ticket: {result.order}")
+        logger.info("✅ Trade abierto: %s %s %s @ %s | SL: %s | TP: %s | "
+                    "Ticket: %s",
+                    order_type, volume, symbol, price, sl, tp, result.order)
 
         return {
             "success": True,
@@ -200,7 +280,7 @@ class MT5Connector:
         """Modificar SL/TP de una posición abierta."""
         position = self._get_position_by_ticket(ticket)
         if position is None:
-            logger.error(f"Posición no encontrada: {ticket}")
+            logger.error("Posición no encontrada: %s", ticket)
             return False
 
         new_sl = sl if sl is not None else position.sl
@@ -217,17 +297,38 @@ class MT5Connector:
         result = mt5.order_send(request)
 
         if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
-            logger.error(f"Error modificando trade {ticket}: {result}")
+            logger.error("Error modificando trade %s: %s", ticket, result)
             return False
 
-        logger.info(f"📝 Trade {ticket} modificado - SL: {new_sl}, TP: {new_tp}")
+        logger.info("📝 Trade %s modificado - SL: %s, TP: %s", ticket, new_sl, new_tp)
         return True
 
+    def modify_trades_batch(self, updates: list) -> list:
+        """
+        Modificar SL/TP de varias posiciones en un solo lote.
+
+        Agrupa todas las modificaciones planificadas de un tick en una sola
+        llamada al conector en lugar de un round-trip por posicion desde el
+        agente. (La API de MT5 no expone un order_send multiple, asi que el
+        envio interno sigue siendo secuencial, pero en rafaga inmediata.)
+
+        Args:
+            updates: lista de dicts con "ticket" y opcionalmente "sl"/"tp"
+
+        Returns:
+            Lista de dicts {"ticket", "success"} en el mismo orden
+        """
+        results = []
+        for upd in updates:
+            ok = self.modify_trade(upd["ticket"], sl=upd.get("sl"), tp=upd.get("tp"))
+            results.append({"ticket": upd["ticket"], "success": ok})
+        return results
+
     def close_trade(self, ticket: int) -> bool:
         """Cerrar una posición por ticket."""
         position = self._get_position_by_ticket(ticket)
         if position is None:
-            logger.error(f"Posición no encontrada: {ticket}")
+            logger.error("Posición no encontrada: %s", ticket)
             return False
 
         if position.type == mt5.ORDER_TYPE_BUY:
@@ -238,26 +339,22 @@ class MT5Connector:
             price = mt5.symbol_info_tick(position.symbol).ask
 
         request = {
-            "action": mt5.TRADE_ACTION_DEAL,
+            **_ORDER_REQUEST_BASE,
             "position": ticket,
             "symbol": position.symbol,
             "volume": position.volume,
             "type": trade_type,
             "price": price,
-            "deviation": 20,
-            "magic": 123456,
             "comment": "AI Agent Close",
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
         }
 
         result = mt5.order_send(request)
 
         if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
-            logger.error(f"Error cerrando trade {ticket}: {result}")
+            logger.error("Error cerrando trade %s: %s", ticket, result)
             return False
 
-        logger.info(f"🔴 Trade {ticket} cerrado @ {price}")
+        logger.info("🔴 Trade %s cerrado @ %s", ticket, price)
         return True
 
     def get_open_positions(self, symbol: str = None) -> list:
@@ -270,6 +367,13 @@ class MT5Connector:
         if positions is None:
             return []
 
+        # point por simbolo desde el cache TTL: una consulta por simbolo
+        # unico en vez de un mt5.symbol_info por posicion
+        points = {}
+        for p in positions:
+            if p.symbol not in points:
+                points[p.symbol] = self.get_symbol_info(p.symbol).get("point", 0.0)
+
         return [
             {
                 "ticket": p.ticket,
@@ -281,7 +385,7 @@ class MT5Connector:
                 "sl": p.sl,
                 "tp": p.tp,
                 "profit": p.profit,
-                "pips": self._calculate_pips(p),
+                "pips": self._calculate_pips(p, points[p.symbol]),
                 "comment": p.comment,
                 "time": datetime.fromtimestamp(p.time),
             }
@@ -295,13 +399,11 @@ class MT5Connector:
             return positions[0]
         return None
 
-    def _calculate_pips(self, position) -> float:
+    def _calculate_pips(self, position, point: float) -> float:
         """Calcular pips de ganancia/pérdida de una posición."""
-        symbol_info = mt5.symbol_info(position.symbol)
-        if symbol_info is None:
+        if not point:
             return 0.0
 
-        point = symbol_info.point
         if position.type == mt5.ORDER_TYPE_BUY:
             pips = (position.price_current - position.price_open) / point / 10
         else:
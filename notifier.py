@@ -5,32 +5,61 @@ Notificador - Envía alertas por Telegram
 
 import requests
 import logging
+import queue
+import threading
 import config
 
 logger = logging.getLogger(__name__)
 
 
 class Notifier:
-    """Enviar notificaciones por Telegram."""
+    """Enviar notificaciones por Telegram (envio en segundo plano)."""
 
     def __init__(self):
         self.enabled = config.TELEGRAM_ENABLED
         self.token = config.TELEGRAM_BOT_TOKEN
         self.chat_id = config.TELEGRAM_CHAT_ID
+        # URL fija y sesion persistente: keep-alive evita rehacer el
+        # handshake TCP+TLS con api.telegram.org en cada mensaje
+        self._url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        self._session = requests.Session()
+        # Cola acotada + hilo daemon: el loop de trading encola y sigue,
+        # nunca espera el round-trip HTTP de Telegram
+        self._queue = queue.Queue(maxsize=256)
+        if self.enabled:
+            threading.Thread(target=self._drain, name="notifier",
+                             daemon=True).start()
 
     def send(self, message: str):
-        """Enviar mensaje por Telegram."""
+        """Encolar mensaje para envio en segundo plano."""
         if not self.enabled:
             return
 
         try:
-            url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # Descartar el mas antiguo: una caida de Telegram nunca
+            # debe frenar el loop de trading
+            try:
+                self._queue.get_nowait()
+                self._queue.put_nowait(message)
+            except (queue.Empty, queue.Full):
+                pass
+
+    def _drain(self):
+        """Consumir la cola y enviar los mensajes pendientes."""
+        while True:
+            self._send_now(self._queue.get())
+
+    def _send_now(self, message: str):
+        """Enviar mensaje por Telegram (bloqueante, solo desde el worker)."""
+        try:
             payload = {
                 "chat_id": self.chat_id,
                 "text": message,
                 "parse_mode": "HTML",
             }
-            response = requests.post(url, json=payload, timeout=10)
+            response = self._session.post(self._url, json=payload, timeout=10)
             if response.status_code != 200:
                 logger.error(f"Error enviando Telegram: {response.text}")
         except Exception as e:
@@ -9,6 +9,7 @@ Risk Manager - Gestion de Riesgo v2.0
 """
 
 import logging
+import numpy as np
 import config
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,37 @@ logger = logging.getLogger(__name__)
 class RiskManager:
     """Gestion de riesgo para operaciones de trading v2.0."""
 
+    def __init__(self):
+        # Cache de niveles por simbolo: las distancias en precio derivadas
+        # de config (pips * point * 10) no cambian intradia, asi que se
+        # calculan una vez por (point, digits) en vez de en cada tick por
+        # cada posicion abierta. Se invalida tras reconexion.
+        self._level_cache = {}
+
+    def _levels(self, symbol_info: dict) -> dict:
+        """Obtener (o calcular) las distancias precomputadas del simbolo."""
+        point = symbol_info.get("point", 0.01)
+        digits = symbol_info.get("digits", 2)
+        key = (point, digits)
+        levels = self._level_cache.get(key)
+        if levels is None:
+            one_pip = point * 10
+            levels = {
+                "one_pip": one_pip,
+                "digits": digits,
+                "sl_distance_fixed": config.STOP_LOSS_PIPS * one_pip,
+                "tp_distance_fixed": config.TAKE_PROFIT_PIPS * one_pip,
+                "be_distance": config.BREAK_EVEN_PIPS * one_pip,
+                "trail_activate": config.TRAILING_ACTIVATE_PIPS * one_pip,
+                "trail_step": config.TRAILING_STEP_PIPS * one_pip,
+            }
+            self._level_cache[key] = levels
+        return levels
+
+    def invalidate_levels(self):
+        """Vaciar el cache de niveles (tras reconexion o cambio de config)."""
+        self._level_cache.clear()
+
     def calculate_lot_size(self, balance: float, symbol_info: dict,
                            sl_distance_price: float = None,
                            risk_percent: float = None) -> float:
@@ -58,10 +90,13 @@ class RiskManager:
         lot_size = min(lot_size, volume_max)
         lot_size = round(lot_size, 2)
 
-        sl_info = f"ATR dist={sl_distance_price:.2f}" if sl_distance_price else f"Fijo {config.STOP_LOSS_PIPS} pips"
-        logger.info(f"Calculo de lote: Balance=${balance:.2f} | "
-                     f"Riesgo={actual_risk}% = ${risk_amount:.2f} | "
-                     f"SL={sl_info} | Lote={lot_size}")
+        # Formato lazy: no construir el mensaje si INFO esta filtrado
+        if logger.isEnabledFor(logging.INFO):
+            sl_info = (f"ATR dist={sl_distance_price:.2f}" if sl_distance_price
+                       else f"Fijo {config.STOP_LOSS_PIPS} pips")
+            logger.info("Calculo de lote: Balance=$%.2f | Riesgo=%s%% = $%.2f | "
+                        "SL=%s | Lote=%s",
+                        balance, actual_risk, risk_amount, sl_info, lot_size)
 
         return lot_size
 
@@ -77,7 +112,8 @@ class RiskManager:
             atr_levels: dict con sl_distance y tp_distance del ATR dinamico.
                        Si es None, usa pips fijos.
         """
-        digits = symbol_info.get("digits", 2)
+        levels = self._levels(symbol_info)
+        digits = levels["digits"]
 
         if atr_levels is not None:
             # ATR dinamico
@@ -86,21 +122,20 @@ class RiskManager:
             mode = "ATR"
         else:
             # Pips fijos (fallback)
-            point = symbol_info.get("point", 0.01)
-            sl_distance = config.STOP_LOSS_PIPS * point * 10
-            tp_distance = config.TAKE_PROFIT_PIPS * point * 10
+            sl_distance = levels["sl_distance_fixed"]
+            tp_distance = levels["tp_distance_fixed"]
             mode = "FIJO"
 
-        if order_type == "BUY":
-            sl = round(current_price - sl_distance, digits)
-            tp = round(current_price + tp_distance, digits)
-        else:  # SELL
-            sl = round(current_price + sl_distance, digits)
-            tp = round(current_price - tp_distance, digits)
+        # Sin ramas: el signo colapsa BUY/SELL en una sola formula (y es el
+        # mismo esquema que usa evaluate_batch con np.where sobre is_buy)
+        sign = 1.0 if order_type == "BUY" else -1.0
+        sl = round(current_price - sign * sl_distance, digits)
+        tp = round(current_price + sign * tp_distance, digits)
 
-        logger.info(f"SL/TP [{mode}]: {order_type} @ {current_price:.{digits}f} | "
-                     f"SL={sl:.{digits}f} (dist={sl_distance:.2f}) | "
-                     f"TP={tp:.{digits}f} (dist={tp_distance:.2f})")
+        logger.info("SL/TP [%s]: %s @ %.*f | SL=%.*f (dist=%.2f) | "
+                    "TP=%.*f (dist=%.2f)",
+                    mode, order_type, digits, current_price, digits, sl,
+                    sl_distance, digits, tp, tp_distance)
 
         return {"sl": sl, "tp": tp, "sl_distance": sl_distance}
 
@@ -112,9 +147,10 @@ class RiskManager:
         Returns:
             {"action": "move_be", "new_sl": float} o {"action": "none"}
         """
-        point = symbol_info.get("point", 0.01)
-        spread = symbol_info.get("spread", 0) * point
-        be_distance = config.BREAK_EVEN_PIPS * point * 10
+        levels = self._levels(symbol_info)
+        # El spread si varia tick a tick: se lee en vivo, no del cache
+        spread = symbol_info.get("spread", 0) * symbol_info.get("point", 0.01)
+        be_distance = levels["be_distance"]
 
         open_price = position["open_price"]
         current_price = position["current_price"]
@@ -123,24 +159,26 @@ class RiskManager:
         # Buffer: entrada + spread + 1 pip (evita que el spread active el SL)
         use_spread_buffer = getattr(config, 'BREAK_EVEN_SPREAD_BUFFER', True)
         if use_spread_buffer:
-            be_buffer = spread + (point * 10)  # spread + 1 pip
+            be_buffer = spread + levels["one_pip"]  # spread + 1 pip
         else:
-            be_buffer = point * 10  # 1 pip (comportamiento anterior)
+            be_buffer = levels["one_pip"]  # 1 pip (comportamiento anterior)
 
         if position["type"] == "BUY":
             if (current_price >= open_price + be_distance and
                     current_sl < open_price):
-                new_sl = round(open_price + be_buffer, symbol_info.get("digits", 2))
-                logger.info(f"Break Even activado para ticket {position['ticket']} | "
-                             f"Nuevo SL={new_sl} (buffer spread={spread:.2f})")
+                new_sl = round(open_price + be_buffer, levels["digits"])
+                logger.info("Break Even activado para ticket %s | "
+                            "Nuevo SL=%s (buffer spread=%.2f)",
+                            position["ticket"], new_sl, spread)
                 return {"action": "move_be", "new_sl": new_sl}
 
         else:  # SELL
             if (current_price <= open_price - be_distance and
                     current_sl > open_price):
-                new_sl = round(open_price - be_buffer, symbol_info.get("digits", 2))
-                logger.info(f"Break Even activado para ticket {position['ticket']} | "
-                             f"Nuevo SL={new_sl} (buffer spread={spread:.2f})")
+                new_sl = round(open_price - be_buffer, levels["digits"])
+                logger.info("Break Even activado para ticket %s | "
+                            "Nuevo SL=%s (buffer spread=%.2f)",
+                            position["ticket"], new_sl, spread)
                 return {"action": "move_be", "new_sl": new_sl}
 
         return {"action": "none"}
@@ -152,10 +190,10 @@ class RiskManager:
         Returns:
             {"action": "trail", "new_sl": float} o {"action": "none"}
         """
-        point = symbol_info.get("point", 0.01)
-        digits = symbol_info.get("digits", 2)
-        trail_activate = config.TRAILING_ACTIVATE_PIPS * point * 10
-        trail_step = config.TRAILING_STEP_PIPS * point * 10
+        levels = self._levels(symbol_info)
+        digits = levels["digits"]
+        trail_activate = levels["trail_activate"]
+        trail_step = levels["trail_step"]
 
         open_price = position["open_price"]
         current_price = position["current_price"]
@@ -165,20 +203,89 @@ class RiskManager:
             if current_price >= open_price + trail_activate:
                 new_sl = round(current_price - trail_step, digits)
                 if new_sl > current_sl:
-                    logger.info(f"Trailing Stop: ticket {position['ticket']} | "
-                                 f"Nuevo SL={new_sl:.{digits}f}")
+                    logger.info("Trailing Stop: ticket %s | Nuevo SL=%.*f",
+                                position["ticket"], digits, new_sl)
                     return {"action": "trail", "new_sl": new_sl}
 
         else:  # SELL
             if current_price <= open_price - trail_activate:
                 new_sl = round(current_price + trail_step, digits)
                 if new_sl < current_sl:
-                    logger.info(f"Trailing Stop: ticket {position['ticket']} | "
-                                 f"Nuevo SL={new_sl:.{digits}f}")
+                    logger.info("Trailing Stop: ticket %s | Nuevo SL=%.*f",
+                                position["ticket"], digits, new_sl)
                     return {"action": "trail", "new_sl": new_sl}
 
         return {"action": "none"}
 
+    def evaluate_batch(self, positions: list, symbol_info: dict) -> list:
+        """
+        Evaluar Break Even y Trailing Stop de varias posiciones en una pasada.
+
+        Version vectorizada de check_break_even/check_trailing_stop: convierte
+        la lista de posiciones a arrays numpy (SoA) y evalua todas las
+        condiciones con comparaciones por lote en vez de 2 llamadas Python por
+        posicion. Break Even tiene prioridad sobre Trailing (igual que el loop
+        original).
+
+        Returns:
+            Lista de {"ticket", "sl", "reason"} lista para modify_trades_batch
+        """
+        if not positions:
+            return []
+
+        levels = self._levels(symbol_info)
+        digits = levels["digits"]
+        spread = symbol_info.get("spread", 0) * symbol_info.get("point", 0.01)
+        be_distance = levels["be_distance"]
+        trail_activate = levels["trail_activate"]
+        trail_step = levels["trail_step"]
+
+        use_spread_buffer = getattr(config, 'BREAK_EVEN_SPREAD_BUFFER', True)
+        if use_spread_buffer:
+            be_buffer = spread + levels["one_pip"]
+        else:
+            be_buffer = levels["one_pip"]
+
+        tickets = [p["ticket"] for p in positions]
+        is_buy = np.array([p["type"] == "BUY" for p in positions])
+        opens = np.array([p["open_price"] for p in positions])
+        currents = np.array([p["current_price"] for p in positions])
+        sls = np.array([p["sl"] for p in positions])
+
+        # Break Even: el precio avanzo be_distance y el SL sigue en zona de perdida
+        be_mask = np.where(
+            is_buy,
+            (currents >= opens + be_distance) & (sls < opens),
+            (currents <= opens - be_distance) & (sls > opens),
+        )
+        be_sl = np.round(np.where(is_buy, opens + be_buffer, opens - be_buffer),
+                         digits)
+
+        # Trailing: activado y el nuevo SL mejora al actual (BE tiene prioridad)
+        trail_sl = np.round(np.where(is_buy, currents - trail_step,
+                                     currents + trail_step), digits)
+        trail_mask = np.where(
+            is_buy,
+            (currents >= opens + trail_activate) & (trail_sl > sls),
+            (currents <= opens - trail_activate) & (trail_sl < sls),
+        ) & ~be_mask
+
+        updates = []
+        for i in np.flatnonzero(be_mask):
+            new_sl = float(be_sl[i])
+            logger.info("Break Even activado para ticket %s | "
+                        "Nuevo SL=%s (buffer spread=%.2f)",
+                        tickets[i], new_sl, spread)
+            updates.append({"ticket": tickets[i], "sl": new_sl,
+                            "reason": "Break Even"})
+        for i in np.flatnonzero(trail_mask):
+            new_sl = float(trail_sl[i])
+            logger.info("Trailing Stop: ticket %s | Nuevo SL=%.*f",
+                        tickets[i], digits, new_sl)
+            updates.append({"ticket": tickets[i], "sl": new_sl,
+                            "reason": "Trailing Stop"})
+        return updates
+
     def check_margin(self, free_margin: float, required_margin: float) -> bool:
         """
         Verificar si hay suficiente margen libre para abrir un trade.
@@ -195,16 +302,13 @@ class RiskManager:
 
         if free_margin < min_margin_needed:
             logger.warning(
-                f"Margen insuficiente: Libre=${free_margin:.2f} | "
-                f"Requerido=${required_margin:.2f} x {safety_factor} = "
-                f"${min_margin_needed:.2f}"
+                "Margen insuficiente: Libre=$%.2f | Requerido=$%.2f x %s = $%.2f",
+                free_margin, required_margin, safety_factor, min_margin_needed
             )
             return False
 
-        logger.info(
-            f"Margen OK: Libre=${free_margin:.2f} | "
-            f"Minimo=${min_margin_needed:.2f}"
-        )
+        logger.info("Margen OK: Libre=$%.2f | Minimo=$%.2f",
+                    free_margin, min_margin_needed)
         return True
 
     def can_open_trade(self, open_positions: list) -> bool:
@@ -213,7 +317,7 @@ class RiskManager:
         can_trade = len(xau_positions) < config.MAX_OPEN_TRADES
 
         if not can_trade:
-            logger.info(f"Maximo de trades alcanzado: "
-                         f"{len(xau_positions)}/{config.MAX_OPEN_TRADES}")
+            logger.info("Maximo de trades alcanzado: %d/%d",
+                        len(xau_positions), config.MAX_OPEN_TRADES)
 
         return can_trade
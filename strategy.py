@@ -19,6 +19,7 @@ Mejoras v2.0:
 
 import pandas as pd
 import numpy as np
+from dataclasses import dataclass
 from datetime import datetime, timezone
 import logging
 import config
@@ -26,12 +27,42 @@ import config
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class StrategyFlags:
+    """
+    Snapshot inmutable de los flags de config que se consultan en el hot path.
+
+    Cada getattr(config, ...) repite un lookup en el dict del modulo y
+    materializa el default en cada tick; capturarlos una vez en __init__
+    deja un solo acceso a atributo (slots) por lectura.
+    """
+    pullback_lookback: int
+    liquidity_lookback: int
+    atr_volatility_filter: bool
+    atr_max_multiplier: float
+    use_dynamic_sl_tp: bool
+    tiered_risk_enabled: bool
+    min_confluences: int
+    risk_by_confluences: dict
+
+
 class Strategy:
     """Estrategia Trend Following + Smart Money + Fibonacci OTE para XAUUSD v2.0."""
 
     def __init__(self):
         self.name = "XAUUSD Trend Following + Liquidity Sweep + Fibonacci OTE v2.0"
         self.fractal_lookback = 5  # Velas a cada lado para detectar fractales
+        self.flags = StrategyFlags(
+            pullback_lookback=getattr(config, 'PULLBACK_LOOKBACK', 5),
+            liquidity_lookback=getattr(config, 'LIQUIDITY_LOOKBACK', 10),
+            atr_volatility_filter=bool(getattr(config, 'ATR_VOLATILITY_FILTER', False)),
+            atr_max_multiplier=getattr(config, 'ATR_MAX_MULTIPLIER', 2.0),
+            use_dynamic_sl_tp=bool(getattr(config, 'USE_DYNAMIC_SL_TP', False)),
+            tiered_risk_enabled=bool(getattr(config, 'TIERED_RISK_ENABLED', False)),
+            min_confluences=getattr(config, 'MIN_CONFLUENCES', 5),
+            risk_by_confluences=getattr(config, 'RISK_BY_CONFLUENCES',
+                                        {5: config.RISK_PERCENT}),
+        )
 
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """Calcular todos los indicadores tecnicos."""
@@ -85,27 +116,13 @@ class Strategy:
         Busca si en las ultimas N velas alguna toco la EMA21 por abajo
         y la vela actual cerro por encima de la EMA21.
         """
-        lookback = getattr(config, 'PULLBACK_LOOKBACK', 5)
-        result = pd.Series(False, index=df.index)
-
-        for i in range(lookback, len(df)):
-            current_close = df['close'].iloc[i]
-            current_ema = df['ema_fast'].iloc[i]
-
-            # La vela actual debe cerrar por encima de la EMA
-            if current_close <= current_ema:
-                continue
-
-            # Buscar si alguna de las ultimas N velas toco la EMA por abajo
-            for j in range(1, lookback + 1):
-                idx = i - j
-                if idx < 0:
-                    break
-                if df['low'].iloc[idx] <= df['ema_fast'].iloc[idx]:
-                    result.iloc[i] = True
-                    break
+        lookback = self.flags.pullback_lookback
 
-        return result
+        # Vectorizado: toque de la EMA por abajo en alguna de las N velas
+        # previas (rolling sobre el shift) + cierre actual sobre la EMA
+        touched = df['low'] <= df['ema_fast']
+        touched_recent = touched.shift(1).rolling(lookback).sum() > 0
+        return (df['close'] > df['ema_fast']) & touched_recent.fillna(False)
 
     def _detect_pullback_sell(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -113,27 +130,13 @@ class Strategy:
         Busca si en las ultimas N velas alguna toco la EMA21 por arriba
         y la vela actual cerro por debajo de la EMA21.
         """
-        lookback = getattr(config, 'PULLBACK_LOOKBACK', 5)
-        result = pd.Series(False, index=df.index)
+        lookback = self.flags.pullback_lookback
 
-        for i in range(lookback, len(df)):
-            current_close = df['close'].iloc[i]
-            current_ema = df['ema_fast'].iloc[i]
-
-            # La vela actual debe cerrar por debajo de la EMA
-            if current_close >= current_ema:
-                continue
-
-            # Buscar si alguna de las ultimas N velas toco la EMA por arriba
-            for j in range(1, lookback + 1):
-                idx = i - j
-                if idx < 0:
-                    break
-                if df['high'].iloc[idx] >= df['ema_fast'].iloc[idx]:
-                    result.iloc[i] = True
-                    break
-
-        return result
+        # Vectorizado: toque de la EMA por arriba en alguna de las N velas
+        # previas + cierre actual bajo la EMA
+        touched = df['high'] >= df['ema_fast']
+        touched_recent = touched.shift(1).rolling(lookback).sum() > 0
+        return (df['close'] < df['ema_fast']) & touched_recent.fillna(False)
 
     def _detect_sweep_high(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -141,20 +144,13 @@ class Strategy:
         Busca si el precio rompio el maximo de las ultimas N velas
         y luego cerro por debajo de ese maximo (trampa alcista / false breakout).
         """
-        lookback = getattr(config, 'LIQUIDITY_LOOKBACK', 10)
-        result = pd.Series(False, index=df.index)
+        lookback = self.flags.liquidity_lookback
 
-        for i in range(lookback, len(df)):
-            # Maximo estructural de las ultimas N velas (excluyendo la actual)
-            structural_high = df['high'].iloc[i - lookback:i].max()
-
-            # La vela actual rompio el maximo estructural con su high
-            # pero cerro por debajo de el (barrido + rechazo)
-            if (df['high'].iloc[i] > structural_high and
-                    df['close'].iloc[i] < structural_high):
-                result.iloc[i] = True
-
-        return result
+        # Maximo estructural de las N velas previas (rolling sobre el shift);
+        # ruptura con el high + cierre por debajo (barrido + rechazo)
+        structural_high = df['high'].shift(1).rolling(lookback).max()
+        return ((df['high'] > structural_high)
+                & (df['close'] < structural_high)).fillna(False)
 
     def _detect_sweep_low(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -162,20 +158,13 @@ class Strategy:
         Busca si el precio rompio el minimo de las ultimas N velas
         y luego cerro por encima de ese minimo (trampa bajista / false breakout).
         """
-        lookback = getattr(config, 'LIQUIDITY_LOOKBACK', 10)
-        result = pd.Series(False, index=df.index)
-
-        for i in range(lookback, len(df)):
-            # Minimo estructural de las ultimas N velas (excluyendo la actual)
-            structural_low = df['low'].iloc[i - lookback:i].min()
+        lookback = self.flags.liquidity_lookback
 
-            # La vela actual rompio el minimo estructural con su low
-            # pero cerro por encima de el (barrido + rechazo)
-            if (df['low'].iloc[i] < structural_low and
-                    df['close'].iloc[i] > structural_low):
-                result.iloc[i] = True
-
-        return result
+        # Minimo estructural de las N velas previas; ruptura con el low
+        # + cierre por encima (barrido + rechazo)
+        structural_low = df['low'].shift(1).rolling(lookback).min()
+        return ((df['low'] < structural_low)
+                & (df['close'] > structural_low)).fillna(False)
 
     def _detect_fractal_high(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -184,22 +173,14 @@ class Strategy:
         a su izquierda y derecha.
         """
         n = self.fractal_lookback
-        fractal = pd.Series(np.nan, index=df.index)
-
-        for i in range(n, len(df) - n):
-            high = df['high'].iloc[i]
-            is_fractal = True
-
-            for j in range(1, n + 1):
-                if (df['high'].iloc[i - j] >= high or
-                        df['high'].iloc[i + j] >= high):
-                    is_fractal = False
-                    break
 
-            if is_fractal:
-                fractal.iloc[i] = high
-
-        return fractal
+        # Maximos de los N vecinos a cada lado via rolling desplazado; el
+        # high central debe superarlos estrictamente (NaN en los bordes
+        # descarta las primeras/ultimas N velas, igual que el rango original)
+        high = df['high']
+        left_max = high.rolling(n).max().shift(1)
+        right_max = high.rolling(n).max().shift(-n)
+        return high.where((high > left_max) & (high > right_max))
 
     def _detect_fractal_low(self, df: pd.DataFrame) -> pd.Series:
         """
@@ -208,22 +189,13 @@ class Strategy:
         a su izquierda y derecha.
         """
         n = self.fractal_lookback
-        fractal = pd.Series(np.nan, index=df.index)
-
-        for i in range(n, len(df) - n):
-            low = df['low'].iloc[i]
-            is_fractal = True
 
-            for j in range(1, n + 1):
-                if (df['low'].iloc[i - j] <= low or
-                        df['low'].iloc[i + j] <= low):
-                    is_fractal = False
-                    break
-
-            if is_fractal:
-                fractal.iloc[i] = low
-
-        return fractal
+        # Minimos de los N vecinos a cada lado via rolling desplazado; el
+        # low central debe ser estrictamente menor que ambos
+        low = df['low']
+        left_min = low.rolling(n).min().shift(1)
+        right_min = low.rolling(n).min().shift(-n)
+        return low.where((low < left_min) & (low < right_min))
 
     def _get_last_swing_points(self, df: pd.DataFrame) -> dict:
         """
@@ -258,7 +230,7 @@ class Strategy:
                      (precio bajo, hizo piso, ahora retrocede a zona OTE)
         """
         swings = self._get_last_swing_points(df)
-        current_price = df.iloc[-2]['close']  # Ultima vela cerrada
+        current_price = df['close'].iloc[-2]  # Ultima vela cerrada
 
         swing_high = swings["swing_high"]
         swing_low = swings["swing_low"]
@@ -275,7 +247,8 @@ class Strategy:
             if swing_high_idx is not None and swing_low_idx is not None:
                 if swing_high_idx <= swing_low_idx:
                     logger.info("📐 Fibonacci BUY: Secuencia temporal invalida "
-                                f"(swing_high_idx={swing_high_idx} <= swing_low_idx={swing_low_idx})")
+                                "(swing_high_idx=%s <= swing_low_idx=%s)",
+                                swing_high_idx, swing_low_idx)
                     return {"in_ote": False, "fib_level": None, "zone_low": None, "zone_high": None}
 
             swing_range = swing_high - swing_low
@@ -301,7 +274,8 @@ class Strategy:
             if swing_high_idx is not None and swing_low_idx is not None:
                 if swing_low_idx <= swing_high_idx:
                     logger.info("📐 Fibonacci SELL: Secuencia temporal invalida "
-                                f"(swing_low_idx={swing_low_idx} <= swing_high_idx={swing_high_idx})")
+                                "(swing_low_idx=%s <= swing_high_idx=%s)",
+                                swing_low_idx, swing_high_idx)
                     return {"in_ote": False, "fib_level": None, "zone_low": None, "zone_high": None}
 
             swing_range = swing_high - swing_low
@@ -321,11 +295,11 @@ class Strategy:
             fib_level = (current_price - swing_low) / swing_range
 
         logger.info(
-            f"📐 Fibonacci: Swing H={swing_high:.2f} (idx={swing_high_idx}) | "
-            f"Swing L={swing_low:.2f} (idx={swing_low_idx}) | "
-            f"OTE Zone=[{zone_low:.2f} - {zone_high:.2f}] | "
-            f"Precio={current_price:.2f} | Fib={fib_level:.3f} | "
-            f"En OTE={'OK' if in_ote else 'NO'}"
+            "📐 Fibonacci: Swing H=%.2f (idx=%s) | Swing L=%.2f (idx=%s) | "
+            "OTE Zone=[%.2f - %.2f] | Precio=%.2f | Fib=%.3f | En OTE=%s",
+            swing_high, swing_high_idx, swing_low, swing_low_idx,
+            zone_low, zone_high, current_price, fib_level,
+            "OK" if in_ote else "NO",
         )
 
         return {
@@ -343,31 +317,34 @@ class Strategy:
         comparado con el promedio de ATR de 50 periodos.
         Retorna True si la volatilidad es aceptable, False si es excesiva.
         """
-        if not getattr(config, 'ATR_VOLATILITY_FILTER', False):
+        if not self.flags.atr_volatility_filter:
             return True
 
         if 'atr' not in df.columns:
             return True
 
-        current_atr = df.iloc[-2]['atr']
-        atr_sma_50 = df['atr'].rolling(window=50).mean().iloc[-2]
+        # Solo se necesita el ultimo valor de la SMA50: media del slice final
+        # en vez de construir la serie rolling completa (O(1) vs O(N))
+        atr_arr = df['atr'].to_numpy()
+        current_atr = atr_arr[-2]
+        atr_sma_50 = atr_arr[-51:-1].mean() if len(atr_arr) >= 51 else np.nan
 
         if pd.isna(current_atr) or pd.isna(atr_sma_50) or atr_sma_50 == 0:
             return True
 
         atr_ratio = current_atr / atr_sma_50
-        max_ratio = getattr(config, 'ATR_MAX_MULTIPLIER', 2.0)
+        max_ratio = self.flags.atr_max_multiplier
 
         if atr_ratio > max_ratio:
             logger.info(
-                f"⚠️ Volatilidad excesiva: ATR={current_atr:.2f} | "
-                f"ATR_SMA50={atr_sma_50:.2f} | Ratio={atr_ratio:.2f} > {max_ratio}"
+                "⚠️ Volatilidad excesiva: ATR=%.2f | ATR_SMA50=%.2f | "
+                "Ratio=%.2f > %s", current_atr, atr_sma_50, atr_ratio, max_ratio
             )
             return False
 
         logger.info(
-            f"📊 Volatilidad OK: ATR={current_atr:.2f} | "
-            f"ATR_SMA50={atr_sma_50:.2f} | Ratio={atr_ratio:.2f}"
+            "📊 Volatilidad OK: ATR=%.2f | ATR_SMA50=%.2f | Ratio=%.2f",
+            current_atr, atr_sma_50, atr_ratio
         )
         return True
 
@@ -377,13 +354,13 @@ class Strategy:
         Retorna distancias en precio (no pips).
         Si USE_DYNAMIC_SL_TP es False, retorna None para usar pips fijos.
         """
-        if not getattr(config, 'USE_DYNAMIC_SL_TP', False):
+        if not self.flags.use_dynamic_sl_tp:
             return None
 
         if 'atr' not in df.columns:
             return None
 
-        current_atr = df.iloc[-2]['atr']
+        current_atr = df['atr'].iloc[-2]
 
         if pd.isna(current_atr) or current_atr <= 0:
             return None
@@ -392,10 +369,11 @@ class Strategy:
         tp_distance = current_atr * config.ATR_TP_MULTIPLIER
 
         logger.info(
-            f"📐 ATR Dinamico: ATR={current_atr:.2f} | "
-            f"SL={sl_distance:.2f} ({config.ATR_SL_MULTIPLIER}x) | "
-            f"TP={tp_distance:.2f} ({config.ATR_TP_MULTIPLIER}x) | "
-            f"Ratio=1:{config.ATR_TP_MULTIPLIER / config.ATR_SL_MULTIPLIER:.1f}"
+            "📐 ATR Dinamico: ATR=%.2f | SL=%.2f (%sx) | TP=%.2f (%sx) | "
+            "Ratio=1:%.1f",
+            current_atr, sl_distance, config.ATR_SL_MULTIPLIER,
+            tp_distance, config.ATR_TP_MULTIPLIER,
+            config.ATR_TP_MULTIPLIER / config.ATR_SL_MULTIPLIER,
         )
 
         return {
@@ -448,29 +426,36 @@ class Strategy:
         if not self.check_volatility_filter(df):
             return no_signal
 
-        # Ultima vela cerrada
-        last = df.iloc[-2]
-
-        current_trend = last['trend']
-        current_rsi = last['rsi']
+        # Ultima vela cerrada: lecturas escalares por columna en vez de
+        # materializar la fila entera (df.iloc[-2] crea una Series object
+        # por la mezcla de dtypes)
+        row = len(df) - 2
+        current_trend = df['trend'].iloc[row]
+        current_rsi = df['rsi'].iloc[row]
+        pullback_buy = bool(df['pullback_buy'].iloc[row])
+        pullback_sell = bool(df['pullback_sell'].iloc[row])
+        sweep_high = bool(df['sweep_high'].iloc[row])
+        sweep_low = bool(df['sweep_low'].iloc[row])
 
         # Log de analisis general
-        atr_value = last['atr'] if not pd.isna(last['atr']) else 0
+        atr_value = df['atr'].iloc[row]
+        if pd.isna(atr_value):
+            atr_value = 0
         logger.info(
-            f"Analisis: Tendencia={current_trend} | RSI={current_rsi:.1f} | "
-            f"EMA21={last['ema_fast']:.2f} | EMA50={last['ema_slow']:.2f} | "
-            f"Close={last['close']:.2f} | ATR={atr_value:.2f}"
+            "Analisis: Tendencia=%s | RSI=%.1f | EMA21=%.2f | EMA50=%.2f | "
+            "Close=%.2f | ATR=%.2f",
+            current_trend, current_rsi, df['ema_fast'].iloc[row],
+            df['ema_slow'].iloc[row], df['close'].iloc[row], atr_value,
         )
         logger.info(
-            f"Liquidity: Sweep High={last['sweep_high']} | "
-            f"Sweep Low={last['sweep_low']} | "
-            f"Pullback Buy={last['pullback_buy']} | "
-            f"Pullback Sell={last['pullback_sell']}"
+            "Liquidity: Sweep High=%s | Sweep Low=%s | Pullback Buy=%s | "
+            "Pullback Sell=%s",
+            sweep_high, sweep_low, pullback_buy, pullback_sell,
         )
 
-        tiered = getattr(config, 'TIERED_RISK_ENABLED', False)
-        min_conf = getattr(config, 'MIN_CONFLUENCES', 5)
-        risk_map = getattr(config, 'RISK_BY_CONFLUENCES', {5: config.RISK_PERCENT})
+        tiered = self.flags.tiered_risk_enabled
+        min_conf = self.flags.min_confluences
+        risk_map = self.flags.risk_by_confluences
 
         # ========== EVALUAR COMPRA ==========
         fib_buy = self._check_fibonacci_ote(df, "BUY")
@@ -478,13 +463,13 @@ class Strategy:
         buy_conditions = {
             "tendencia": current_trend == 'BULLISH',
             "rsi": config.RSI_LOWER <= current_rsi <= config.RSI_UPPER,
-            "pullback": bool(last['pullback_buy']),
-            "liquidity": bool(last['sweep_low']),
+            "pullback": pullback_buy,
+            "liquidity": sweep_low,
             "fibonacci_ote": fib_buy["in_ote"],
         }
 
         buy_met = sum(buy_conditions.values())
-        logger.info(f"Compra ({buy_met}/5): {buy_conditions}")
+        logger.info("Compra (%d/5): %s", buy_met, buy_conditions)
 
         # ========== EVALUAR VENTA ==========
         fib_sell = self._check_fibonacci_ote(df, "SELL")
@@ -492,13 +477,13 @@ class Strategy:
         sell_conditions = {
             "tendencia": current_trend == 'BEARISH',
             "rsi": config.RSI_LOWER <= current_rsi <= config.RSI_UPPER,
-            "pullback": bool(last['pullback_sell']),
-            "liquidity": bool(last['sweep_high']),
+            "pullback": pullback_sell,
+            "liquidity": sweep_high,
             "fibonacci_ote": fib_sell["in_ote"],
         }
 
         sell_met = sum(sell_conditions.values())
-        logger.info(f"Venta ({sell_met}/5): {sell_conditions}")
+        logger.info("Venta (%d/5): %s", sell_met, sell_conditions)
 
         # ========== DETERMINAR MEJOR SENAL ==========
         # Priorizar la direccion con mas confluencias
@@ -536,8 +521,9 @@ class Strategy:
 
         if best_met < required:
             if best_met >= 3:
-                logger.info(f"Senal {best_signal} descartada: {best_met}/5 confluencias "
-                            f"(minimo requerido: {required})")
+                logger.info("Senal %s descartada: %d/5 confluencias "
+                            "(minimo requerido: %d)",
+                            best_signal, best_met, required)
             else:
                 logger.info("Sin senal")
             return no_signal
@@ -545,7 +531,7 @@ class Strategy:
         # Calcular riesgo segun confluencias
         risk_percent = risk_map.get(best_met, 0)
         if risk_percent <= 0:
-            logger.info(f"Sin riesgo asignado para {best_met} confluencias")
+            logger.info("Sin riesgo asignado para %d confluencias", best_met)
             return no_signal
 
         # Obtener ATR levels
@@ -553,9 +539,9 @@ class Strategy:
 
         conf_label = "MAXIMA" if best_met == 5 else "ALTA" if best_met == 4 else "MODERADA"
         logger.info(
-            f"SENAL DE {'COMPRA' if best_signal == 'BUY' else 'VENTA'} - "
-            f"{best_met}/5 confluencias | Confianza {conf_label} | "
-            f"Riesgo={risk_percent}%"
+            "SENAL DE %s - %d/5 confluencias | Confianza %s | Riesgo=%s%%",
+            "COMPRA" if best_signal == "BUY" else "VENTA",
+            best_met, conf_label, risk_percent,
         )
 
         return {
@@ -566,6 +552,166 @@ class Strategy:
             "risk_percent": risk_percent,
         }
 
+    def precompute(self, df: pd.DataFrame) -> dict:
+        """
+        Precalcular indicadores y senales de toda la serie en una sola pasada.
+
+        Pensado para backtesting: todos los indicadores de
+        calculate_indicators son causales (EMAs, RSI, ATR, pullbacks y
+        sweeps solo miran hacia atras), asi que sus valores por fila
+        coinciden con los que se obtendrian recalculando sobre cada ventana
+        creciente. La excepcion son los fractales, que necesitan n velas
+        futuras para confirmarse: signals_vector los filtra por indice
+        (idx <= i - n) para no mirar al futuro.
+
+        Returns:
+            dict de arrays numpy alineados con df, listo para signals_vector
+        """
+        ind = self.calculate_indicators(df)
+
+        fh_mask = ind['fractal_high'].notna().to_numpy()
+        fl_mask = ind['fractal_low'].notna().to_numpy()
+
+        return {
+            "close": ind['close'].to_numpy(),
+            "rsi": ind['rsi'].to_numpy(),
+            "atr": ind['atr'].to_numpy(),
+            "atr_sma50": ind['atr'].rolling(window=50).mean().to_numpy(),
+            "is_bullish": (ind['trend'] == 'BULLISH').to_numpy(),
+            "pullback_buy": ind['pullback_buy'].to_numpy(),
+            "pullback_sell": ind['pullback_sell'].to_numpy(),
+            "sweep_high": ind['sweep_high'].to_numpy(),
+            "sweep_low": ind['sweep_low'].to_numpy(),
+            "fractal_high_idx": np.flatnonzero(fh_mask),
+            "fractal_high_val": ind['fractal_high'].to_numpy()[fh_mask],
+            "fractal_low_idx": np.flatnonzero(fl_mask),
+            "fractal_low_val": ind['fractal_low'].to_numpy()[fl_mask],
+        }
+
+    def signals_vector(self, pre: dict, start: int) -> tuple:
+        """
+        Evaluar la senal de TODAS las barras en una sola pasada vectorizada.
+
+        Equivale a evaluar check_signal sobre la ventana df.iloc[:i+1]
+        para cada i >= start,
+        pero con operaciones de array: las condiciones se evaluan sobre la
+        vela cerrada (shift de 1 barra), el OTE de Fibonacci se resuelve
+        con un unico searchsorted por serie de fractales y la cascada de
+        decision BUY/SELL se compone con mascaras booleanas.
+
+        Returns:
+            (signals int8 [1/-1/0], sl_dist, tp_dist, risk_pct, confluences)
+            sl/tp_dist traen NaN donde no aplica el ATR dinamico (el
+            llamador decide el fallback fijo).
+        """
+        close = pre["close"]
+        n = len(close)
+
+        # Valores en la vela cerrada (r = i-1): shift de una barra
+        bullish_p = np.concatenate(([False], pre["is_bullish"][:-1]))
+        rsi_p = np.concatenate(([np.nan], pre["rsi"][:-1]))
+        atr_p = np.concatenate(([np.nan], pre["atr"][:-1]))
+        atr_sma_p = np.concatenate(([np.nan], pre["atr_sma50"][:-1]))
+        pb_buy_p = np.concatenate(([False], pre["pullback_buy"][:-1]))
+        pb_sell_p = np.concatenate(([False], pre["pullback_sell"][:-1]))
+        sw_low_p = np.concatenate(([False], pre["sweep_low"][:-1]))
+        sw_high_p = np.concatenate(([False], pre["sweep_high"][:-1]))
+        close_p = np.concatenate(([np.nan], close[:-1]))
+
+        rsi_ok = (rsi_p >= config.RSI_LOWER) & (rsi_p <= config.RSI_UPPER)
+
+        # Filtro de volatilidad (NaN o ATR_SMA==0 pasan, como el escalar)
+        if self.flags.atr_volatility_filter:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                vol_bad = (atr_p / atr_sma_p) > self.flags.atr_max_multiplier
+            vol_bad &= atr_sma_p != 0
+            vol_ok = ~vol_bad
+        else:
+            vol_ok = np.ones(n, dtype=bool)
+
+        # Fibonacci OTE: ultimo fractal confirmable por barra (idx <= i - n)
+        fh_idx = pre["fractal_high_idx"]
+        fh_val = pre["fractal_high_val"]
+        fl_idx = pre["fractal_low_idx"]
+        fl_val = pre["fractal_low_val"]
+
+        if fh_idx.size == 0 or fl_idx.size == 0:
+            fib_buy = np.zeros(n, dtype=bool)
+            fib_sell = np.zeros(n, dtype=bool)
+        else:
+            limits = np.arange(n) - self.fractal_lookback
+            hp = np.searchsorted(fh_idx, limits, side='right') - 1
+            lp = np.searchsorted(fl_idx, limits, side='right') - 1
+            valid = (hp >= 0) & (lp >= 0)
+            hp_c = np.maximum(hp, 0)
+            lp_c = np.maximum(lp, 0)
+
+            swing_high = fh_val[hp_c]
+            swing_low = fl_val[lp_c]
+            swing_high_i = fh_idx[hp_c]
+            swing_low_i = fl_idx[lp_c]
+            swing_range = swing_high - swing_low
+            range_ok = swing_range > 0
+
+            zone_b_high = swing_high - swing_range * 0.618
+            zone_b_low = swing_high - swing_range * 0.786
+            fib_buy = (valid & (swing_high_i > swing_low_i) & range_ok
+                       & (zone_b_low <= close_p) & (close_p <= zone_b_high))
+
+            zone_s_low = swing_low + swing_range * 0.618
+            zone_s_high = swing_low + swing_range * 0.786
+            fib_sell = (valid & (swing_low_i > swing_high_i) & range_ok
+                        & (zone_s_low <= close_p) & (close_p <= zone_s_high))
+
+        # Confluencias por direccion
+        buy_met = (bullish_p.astype(np.int8) + rsi_ok.astype(np.int8)
+                   + pb_buy_p.astype(np.int8) + sw_low_p.astype(np.int8)
+                   + fib_buy.astype(np.int8))
+        bearish_p = ~bullish_p
+        sell_met = (bearish_p.astype(np.int8) + rsi_ok.astype(np.int8)
+                    + pb_sell_p.astype(np.int8) + sw_high_p.astype(np.int8)
+                    + fib_sell.astype(np.int8))
+
+        # Cascada de decision (misma prioridad que check_signal)
+        min_conf = self.flags.min_confluences
+        cond1 = bullish_p & (buy_met >= sell_met)
+        cond2 = ~cond1 & bearish_p & (sell_met > buy_met)
+        cond3 = ~cond1 & ~cond2 & bullish_p & (buy_met >= min_conf)
+        cond4 = ~cond1 & ~cond2 & ~cond3 & bearish_p & (sell_met >= min_conf)
+
+        is_buy = cond1 | cond3
+        is_sell = cond2 | cond4
+        best_met = np.where(is_buy, buy_met, np.where(is_sell, sell_met, 0))
+
+        # Minimo de confluencias y riesgo asignado (LUT sobre el dict)
+        required = min_conf if self.flags.tiered_risk_enabled else 5
+        risk_lut = np.array([self.flags.risk_by_confluences.get(m, 0)
+                             for m in range(6)], dtype=np.float64)
+        risk = risk_lut[best_met]
+
+        ok = (is_buy | is_sell) & (best_met >= required) & (risk > 0) & vol_ok
+        ok[:start] = False
+
+        signals = np.where(ok, np.where(is_buy, 1, -1), 0).astype(np.int8)
+
+        # ATR dinamico (NaN donde no aplica, mismas reglas que el escalar)
+        if self.flags.use_dynamic_sl_tp:
+            dyn_ok = ~np.isnan(atr_p) & (atr_p > 0)
+            sl_dist = np.where(dyn_ok,
+                               np.round(atr_p * config.ATR_SL_MULTIPLIER, 2),
+                               np.nan)
+            tp_dist = np.where(dyn_ok,
+                               np.round(atr_p * config.ATR_TP_MULTIPLIER, 2),
+                               np.nan)
+        else:
+            sl_dist = np.full(n, np.nan)
+            tp_dist = np.full(n, np.nan)
+
+        risk_pcts = np.where(ok, risk, 0.0)
+        confluences = np.where(ok, best_met, 0).astype(np.int64)
+
+        return signals, sl_dist, tp_dist, risk_pcts, confluences
+
     def is_session_active(self) -> bool:
         """Verificar si estamos en sesion de Londres o New York (UTC)."""
         now_utc = datetime.now(timezone.utc)
@@ -579,9 +725,10 @@ class Strategy:
             return False
 
         if not is_active:
-            logger.info(f"Fuera de sesion ({hour}:00 UTC). "
-                         f"Sesion activa: {config.SESSION_START_HOUR}:00 - "
-                         f"{config.SESSION_END_HOUR}:00 UTC")
+            logger.info("Fuera de sesion (%d:00 UTC). "
+                         "Sesion activa: %d:00 - %d:00 UTC",
+                         hour, config.SESSION_START_HOUR,
+                         config.SESSION_END_HOUR)
 
         return is_active
 